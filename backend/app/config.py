@@ -1,15 +1,47 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Literal
 
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str = Field(default="", env="OPENAI_API_KEY")
     EMBEDDING_MODEL: str = Field("text-embedding-3-small", env="EMBEDDING_MODEL")
+    EMBEDDING_DIM: int = Field(1536, env="EMBEDDING_DIM")
+
+    # Reduced-dimension coarse vector stored next to the full one (0 disables)
+    COARSE_VECTOR_DIM: int = Field(0, env="COARSE_VECTOR_DIM")
+    COARSE_OVERSAMPLING: float = Field(4.0, env="COARSE_OVERSAMPLING")
+    SEARCH_MODE: Literal["full", "two_stage"] = Field("two_stage", env="SEARCH_MODE")
 
     QDRANT_API_KEY: str = Field(default="", env="QDRANT_API_KEY")
     QDRANT_URL: str = Field(default="", env="QDRANT_URL")
     QDRANT_COLLECTION: str = Field("semantic_spots", env="QDRANT_COLLECTION")
 
+    # Upstream resilience: per-search deadline, retries, hedging and circuit breaking
+    SEARCH_DEADLINE_S: float = Field(8.0, env="SEARCH_DEADLINE_S")
+    EMBEDDING_DEADLINE_SHARE: float = Field(0.5, env="EMBEDDING_DEADLINE_SHARE")
+    UPSTREAM_TIMEOUT_S: float = Field(30.0, env="UPSTREAM_TIMEOUT_S")
+    UPSTREAM_MAX_RETRIES: int = Field(2, env="UPSTREAM_MAX_RETRIES")
+    UPSTREAM_BACKOFF_S: float = Field(0.1, env="UPSTREAM_BACKOFF_S")
+    UPSTREAM_HEDGING: bool = Field(True, env="UPSTREAM_HEDGING")
+    # Attempts in flight per upstream (and per shard); matches FastAPI's default sync threadpool
+    UPSTREAM_MAX_CONCURRENCY: int = Field(40, env="UPSTREAM_MAX_CONCURRENCY")
+    CIRCUIT_FAILURE_THRESHOLD: int = Field(5, env="CIRCUIT_FAILURE_THRESHOLD")
+    CIRCUIT_RESET_S: float = Field(30.0, env="CIRCUIT_RESET_S")
+    QUERY_CACHE_SIZE: int = Field(512, env="QUERY_CACHE_SIZE")
+
+    # Region sharding: spots routed to per-geohash-prefix collections
+    SHARDING_ENABLED: bool = Field(False, env="SHARDING_ENABLED")
+    SHARD_GEOHASH_PRECISION: int = Field(3, env="SHARD_GEOHASH_PRECISION")
+    SHARD_MAX_POINTS: int = Field(50000, env="SHARD_MAX_POINTS")
+    SHARD_REGISTRY_TTL_S: float = Field(60.0, env="SHARD_REGISTRY_TTL_S")
+
+    # Clustered map tiles
+    TILE_MAX_ZOOM: int = Field(12, env="TILE_MAX_ZOOM")
+    TILE_GRID_SIZE: int = Field(8, env="TILE_GRID_SIZE")
+    TILE_TOP_TAGS: int = Field(3, env="TILE_TOP_TAGS")
+    TILE_CACHE_SIZE: int = Field(2048, env="TILE_CACHE_SIZE")
+
     HOST: str = Field("0.0.0.0", env="HOST")
     PORT: int = Field(8000, env="PORT")
 
@@ -1,7 +1,10 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import spots, search
 from .config import settings
+from .services.tiles import load_tile_index
+from .services.vectordb import check_coarse_model
 import logging
 import sys
 
@@ -41,6 +44,19 @@ async def startup_event():
     logger.info(f"Qdrant URL: {settings.QDRANT_URL}")
     logger.info(f"Qdrant Collection: {settings.QDRANT_COLLECTION}")
     logger.info(f"Embedding Model: {settings.EMBEDDING_MODEL}")
+    try:
+        check_coarse_model()
+    except ValueError as e:
+        # Spot creation refuses this configuration; searches would rank on meaningless coarse vectors
+        logger.error(f"Coarse vector misconfigured: {e}")
+    # Loading scrolls the whole catalog; run it in a thread so the server starts serving meanwhile
+    app.state.tile_index_task = asyncio.create_task(_load_tile_index())
+
+async def _load_tile_index():
+    try:
+        await asyncio.to_thread(load_tile_index)
+    except Exception as e:
+        logger.error(f"Failed to load tile index, map tiles start empty: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
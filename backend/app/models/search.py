@@ -28,3 +28,4 @@ class SearchResultItem(BaseModel):
 class SearchResponse(BaseModel):
     query: str
     results: List[SearchResultItem]
+    degraded: Optional[str] = None
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class TileCluster(BaseModel):
+    count: int
+    lat: float
+    lon: float
+    avg_traffic: float
+    top_tags: List[str]
+
+
+class TileResponse(BaseModel):
+    z: int
+    x: int
+    y: int
+    total: int
+    clusters: List[TileCluster]
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from ..models.search import SearchRequest, SearchResponse, SearchResultItem
 from ..services.search_engine import search_spots
+from ..services.resilience import BulkheadFullError, CircuitOpenError, DeadlineExceeded
+from ..services.sharding import shard_metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,7 @@ def semantic_search(req: SearchRequest):
             user_lat=req.lat,
             user_lon=req.lon,
             top_k=req.top_k or 20,
+            radius_km=req.radius_km,
         )
         logger.info(f"Search engine returned {len(results)} results")
 
@@ -26,7 +29,8 @@ def semantic_search(req: SearchRequest):
             try:
                 item = SearchResultItem(
                     id=r["id"],
-                    title=r["title"],
+                    # Results served without display fields (degraded="no_display_fields") fall back to the id
+                    title=r["title"] if r["title"] is not None else r["id"],
                     description=r["description"],
                     category_tags=r["category_tags"] or [],
                     lat=r["lat"],
@@ -43,9 +47,22 @@ def semantic_search(req: SearchRequest):
                 logger.error(f"Failed to create result item {i+1}: {item_error}")
                 continue
         
-        logger.info(f"Returning {len(items)} search results")
-        return SearchResponse(query=req.query, results=items)
+        degraded = results[0].get("degraded") if results else None
+        logger.info(f"Returning {len(items)} search results (degraded={degraded})")
+        return SearchResponse(query=req.query, results=items, degraded=degraded)
         
+    except DeadlineExceeded as e:
+        logger.error(f"Search request timed out: {e}")
+        raise HTTPException(status_code=504, detail=f"Search timed out: {str(e)}")
+    except (CircuitOpenError, BulkheadFullError) as e:
+        logger.error(f"Search upstream unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"Search temporarily unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"Search request failed: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/shards/metrics")
+def search_shard_metrics():
+    """Per-shard search latency and error counts since startup."""
+    return {"shards": shard_metrics()}
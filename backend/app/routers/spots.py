@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from ..models.spots import SpotCreate, SpotResponse
-from ..services.embeddings import embed_text
+from ..models.tiles import TileResponse
+from ..services.embeddings import embed_text, spot_embedding_text
 from ..services.vectordb import upsert_spot, ensure_collection
+from ..services.sharding import route_spot
+from ..services.tiles import index_spot, tile_index
 import uuid
 from ..config import settings
 from typing import Dict
@@ -14,15 +17,19 @@ router = APIRouter(prefix="/spots", tags=["spots"])
 
 @router.post("/", response_model=SpotResponse)
 def create_spot(payload: SpotCreate):
-    # Ensure collection exists before creating spot
+    # Ensure collection (or the spot's region shard) exists before creating spot
     try:
-        ensure_collection(collection_name=settings.QDRANT_COLLECTION, vector_size=1536)
+        if settings.SHARDING_ENABLED:
+            collection_name = route_spot(payload.lat, payload.lon)
+        else:
+            collection_name = settings.QDRANT_COLLECTION
+            ensure_collection(collection_name=collection_name, vector_size=settings.EMBEDDING_DIM)
     except Exception as e:
         logger.error(f"Failed to ensure collection: {e}")
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
     
     spot_id = str(uuid.uuid4())
-    full_text = f"{payload.title} {payload.description or ''} {' '.join(payload.category_tags or [])}"
+    full_text = spot_embedding_text(payload.model_dump())
     embedding = embed_text([full_text], model=settings.EMBEDDING_MODEL)[0]
     metadata: Dict = {
         "title": payload.title,
@@ -33,7 +40,8 @@ def create_spot(payload: SpotCreate):
         "precomputed_traffic": 0.0,
         "traffic_confidence": "low",
     }
-    upsert_spot(spot_id=spot_id, embedding=embedding, metadata=metadata, collection_name=settings.QDRANT_COLLECTION)
+    upsert_spot(spot_id=spot_id, embedding=embedding, metadata=metadata, collection_name=collection_name)
+    index_spot(spot_id, metadata)
 
     resp = SpotResponse(
         id=spot_id,
@@ -51,3 +59,12 @@ def create_spot(payload: SpotCreate):
         traffic_confidence=metadata["traffic_confidence"],
     )
     return resp
+
+
+@router.get("/tiles/{z}/{x}/{y}", response_model=TileResponse)
+def spot_tile(z: int, x: int, y: int):
+    """Pre-aggregated spot clusters for one Web Mercator map tile."""
+    try:
+        return tile_index.tile(z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
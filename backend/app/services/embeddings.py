@@ -1,26 +1,55 @@
 import os
-from typing import List
+from typing import Dict, List, Optional
 import openai
 from ..config import settings
+from .resilience import CircuitBreaker, Deadline, ResilientCaller
 import logging
 
 logger = logging.getLogger(__name__)
 
 openai.api_key = settings.OPENAI_API_KEY
 
+embedding_caller = ResilientCaller(
+    "embeddings",
+    breaker=CircuitBreaker(
+        "embeddings",
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout_s=settings.CIRCUIT_RESET_S,
+    ),
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    backoff_s=settings.UPSTREAM_BACKOFF_S,
+    hedge=settings.UPSTREAM_HEDGING,
+    max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY,
+)
 
-def embed_text(texts: List[str], model: str = None) -> List[List[float]]:
+
+def spot_embedding_text(payload: Dict) -> str:
+    """
+    Text embedded for a spot: title, description and category tags.
+    """
+    text = f"{payload.get('title') or ''} {payload.get('description') or ''}"
+    if payload.get("category_tags"):
+        text += " " + " ".join(payload["category_tags"])
+    return text
+
+
+def embed_text(texts: List[str], model: str = None, deadline: Optional[Deadline] = None) -> List[List[float]]:
     """
     Convert a list of texts to embeddings using OpenAI embeddings.
     Returns list of vector embeddings (floats).
+    The call is bounded by `deadline` (UPSTREAM_TIMEOUT_S when not given).
     """
     model = model or settings.EMBEDDING_MODEL
-    logger.info(f"Creating embeddings for {len(texts)} texts using model '{model}'")
+    deadline = deadline or Deadline(settings.UPSTREAM_TIMEOUT_S)
+    logger.info(f"Creating embeddings for {len(texts)} texts using model '{model}', budget {deadline.remaining():.2f}s")
     logger.debug(f"Texts to embed: {texts}")
-    
-    try:
+
+    def _create(timeout_s: float):
         # OpenAI's Python SDK returns embedding per input
-        resp = openai.Embedding.create(model=model, input=texts)
+        return openai.Embedding.create(model=model, input=texts, request_timeout=timeout_s)
+
+    try:
+        resp = embedding_caller.call(_create, deadline, operation="embed")
         embeddings = [item["embedding"] for item in resp["data"]]
         logger.info(f"Successfully created {len(embeddings)} embeddings with dimension {len(embeddings[0]) if embeddings else 0}")
         return embeddings
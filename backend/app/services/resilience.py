@@ -0,0 +1,298 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_OPERATION = "call"
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an upstream call does not finish within its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a circuit breaker rejects a call without attempting it."""
+
+
+class BulkheadFullError(RuntimeError):
+    """Raised when an upstream's concurrency limit stays saturated until the deadline."""
+
+
+class _NotStarted(Exception):
+    """Wraps the error of an attempt that never reached the upstream."""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+class Deadline:
+    """
+    Absolute point in time by which a request must finish.
+    Stages take a share of the remaining budget via child().
+    """
+
+    def __init__(self, timeout_s: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + max(0.0, timeout_s)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def child(self, share: float = 1.0) -> "Deadline":
+        return Deadline(self.remaining() * share, clock=self._clock)
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies (seconds).
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Returns None until enough samples have been recorded."""
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls until
+    `reset_timeout_s` has passed, then lets a single trial call through (half-open)
+    and keeps rejecting the rest until it resolves. A failed trial re-opens the
+    circuit; a successful one closes it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout_s:
+                    return False
+                self._state = self.HALF_OPEN
+                logger.info(f"Circuit '{self.name}' half-open, allowing trial call")
+            elif self._state == self.HALF_OPEN and self._probe_in_flight:
+                return False
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self):
+        """Forgets a trial call that was allowed but never reached the upstream."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+class ResilientCaller:
+    """
+    Runs calls to one upstream with a deadline, hedging, jittered retries and a circuit breaker.
+
+    The wrapped function receives the remaining budget in seconds so it can pass it on
+    as the client's own timeout. Latencies are tracked per `operation` (e.g. "search",
+    "scroll"), and once an operation's p95 is known a duplicate (hedged) request is
+    started if the first one has not returned by then; whichever finishes first wins.
+    The circuit breaker is shared by all operations of the upstream.
+
+    Each caller is a bulkhead: it runs at most `max_concurrency` attempts at once on its
+    own thread pool, so a slow upstream cannot starve the others. A call that cannot get
+    a slot before its deadline fails with BulkheadFullError; like a call whose deadline
+    ran out before it started, it is not counted as an upstream failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: Optional[CircuitBreaker] = None,
+        tracker: Optional[LatencyTracker] = None,
+        max_retries: int = 2,
+        backoff_s: float = 0.1,
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        max_concurrency: int = 16,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name)
+        # `tracker` serves the default operation; other operations get their own on first use
+        self.tracker = tracker or LatencyTracker()
+        self._trackers = {DEFAULT_OPERATION: self.tracker}
+        self._trackers_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"upstream-{name}")
+        self._sleep = sleep
+
+    def tracker_for(self, operation: str = DEFAULT_OPERATION) -> LatencyTracker:
+        with self._trackers_lock:
+            if operation not in self._trackers:
+                self._trackers[operation] = LatencyTracker()
+            return self._trackers[operation]
+
+    def call(
+        self,
+        fn: Callable[[float], T],
+        deadline: Deadline,
+        fallback: Optional[Callable[[Exception], T]] = None,
+        operation: str = DEFAULT_OPERATION,
+    ) -> T:
+        if not self.breaker.allow():
+            error = CircuitOpenError(f"Circuit '{self.name}' is open")
+            return self._fail(error, fallback)
+
+        tracker = self.tracker_for(operation)
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(fn, deadline, tracker)
+                self.breaker.record_success()
+                return result
+            except _NotStarted as e:
+                self.breaker.release()
+                logger.warning(f"Upstream '{self.name}' attempt {attempt + 1} not started: {e.error!r}")
+                return self._fail(e.error, fallback)
+            except Exception as e:
+                self.breaker.record_failure()
+                logger.warning(f"Upstream '{self.name}' attempt {attempt + 1} failed: {e!r}")
+                if attempt >= self.max_retries or isinstance(e, DeadlineExceeded) or not self.breaker.allow():
+                    return self._fail(e, fallback)
+                # Full jitter: sleep a random time up to the exponential backoff cap
+                delay = random.uniform(0.0, self.backoff_s * (2 ** attempt))
+                if delay >= deadline.remaining():
+                    return self._fail(DeadlineExceeded(f"No budget left to retry '{self.name}'"), fallback)
+                self._sleep(delay)
+                attempt += 1
+
+    def _fail(self, error: Exception, fallback: Optional[Callable[[Exception], T]]) -> T:
+        if fallback is None:
+            raise error
+        logger.warning(f"Upstream '{self.name}' unavailable ({error!r}), using fallback")
+        return fallback(error)
+
+    def _run(self, fn: Callable[[float], T], deadline: Deadline, tracker: LatencyTracker) -> T:
+        # Runs on the caller's pool while holding a slot; the budget is taken when the call starts
+        try:
+            start = time.monotonic()
+            result = fn(deadline.remaining())
+            tracker.record(time.monotonic() - start)
+            return result
+        finally:
+            self._slots.release()
+
+    def _submit(self, fn: Callable[[float], T], deadline: Deadline, tracker: LatencyTracker):
+        try:
+            return self._executor.submit(self._run, fn, deadline, tracker)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _attempt(self, fn: Callable[[float], T], deadline: Deadline, tracker: LatencyTracker) -> T:
+        if deadline.expired():
+            raise _NotStarted(DeadlineExceeded(f"Deadline exceeded before calling '{self.name}'"))
+        if not self._slots.acquire(timeout=deadline.remaining()):
+            raise _NotStarted(
+                BulkheadFullError(f"'{self.name}' has {self.max_concurrency} calls in flight and no slot freed up within the deadline")
+            )
+
+        hedge_delay = tracker.percentile(self.hedge_percentile) if self.hedge else None
+        hedged = hedge_delay is None
+        started = time.monotonic()
+        pending = {self._submit(fn, deadline, tracker)}
+        error: Optional[Exception] = None
+
+        while pending:
+            timeout = deadline.remaining()
+            if not hedged:
+                timeout = min(timeout, max(0.0, hedge_delay - (time.monotonic() - started)))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    return future.result()
+                error = exc
+
+            if not done:
+                if deadline.expired():
+                    raise DeadlineExceeded(f"Upstream '{self.name}' did not answer within its deadline")
+                if not hedged:
+                    hedged = True
+                    # Only hedge with a spare slot; under saturation a duplicate would only add load
+                    if self._slots.acquire(blocking=False):
+                        logger.info(f"Hedging '{self.name}' after {hedge_delay * 1000:.0f}ms")
+                        pending.add(self._submit(fn, deadline, tracker))
+
+        raise error
@@ -1,85 +1,271 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import heapq
+import re
 from ..services.embeddings import embed_text
-from ..services.vectordb import search_vectors
+from ..services.vectordb import search_vectors, scroll_payloads, fetch_payloads, SCORING_PAYLOAD_FIELDS
+from ..services.resilience import Deadline, DeadlineExceeded
+from ..services.sharding import caller_for, search_shards, shards_for_location
+from ..utils.cache import LRUCache
 from ..utils.geo import haversine_km
-from ..utils.scoring import geo_score, normalize, final_score
+from ..utils.scoring import geo_score, normalize, final_score, merge_ranked
 from ..config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+TRAFFIC_MIN = 0.0
+TRAFFIC_MAX = 10000.0
+
+# Last good query embeddings and result lists, served when an upstream is unavailable
+_query_embeddings = LRUCache(settings.QUERY_CACHE_SIZE)
+_query_results = LRUCache(settings.QUERY_CACHE_SIZE)
+
+
+def _tokens(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+
+def lexical_candidates(
+    query: str,
+    top_k: int,
+    deadline: Optional[Deadline] = None,
+    collections: Optional[List[str]] = None,
+) -> List[Dict]:
+    """
+    Degraded search used when no query embedding is available: rank stored spots
+    by the share of query tokens found in their title, description and tags.
+
+    Collections are scanned page by page until they are exhausted or the deadline
+    runs out; in the latter case only the spots scanned so far are ranked. A failing
+    shard is logged and skipped; the scan only fails if every collection fails.
+    """
+    query_tokens = _tokens(query)
+    if not query_tokens:
+        return []
+
+    names = [settings.QDRANT_COLLECTION] if collections is None else collections
+    scored: List[Dict] = []
+    scanned = 0
+    errors = []
+    for name in names:
+        offset = None
+        while True:
+            try:
+                page, offset = scroll_payloads(offset=offset, collection_name=name, deadline=deadline, caller=caller_for(name))
+            except DeadlineExceeded:
+                if scanned == 0:
+                    raise
+                logger.warning(f"Lexical scan hit the deadline after {scanned} spots, ranking those only")
+                return sorted(scored, key=lambda x: x["score"], reverse=True)
+            except Exception as e:
+                logger.error(f"Lexical scan of '{name}' failed: {e}")
+                errors.append(e)
+                break
+            scanned += len(page)
+            for r in page:
+                payload = r["payload"]
+                text = " ".join([payload.get("title") or "", payload.get("description") or ""] + list(payload.get("category_tags") or []))
+                overlap = len(query_tokens & _tokens(text)) / len(query_tokens)
+                if overlap > 0:
+                    scored.append({"id": r["id"], "score": overlap, "payload": payload, "collection": r["collection"]})
+            # Only the best top_k can make the result, so memory stays bounded however large the catalog
+            scored = heapq.nlargest(top_k, scored, key=lambda x: x["score"])
+            if offset is None or not page:
+                break
+
+    if errors and len(errors) == len(names):
+        raise errors[0]
+    logger.info(f"Lexical scan ranked {scanned} spots")
+    return sorted(scored, key=lambda x: x["score"], reverse=True)
+
+
+def _score_candidates(
+    vec_results: List[Dict],
+    user_lat: float | None,
+    user_lon: float | None,
+) -> List[Dict[str, Any]]:
+    processed = []
+    for i, r in enumerate(vec_results):
+        payload = r.get("payload", {})
+        meta_lat = payload.get("lat")
+        meta_lon = payload.get("lon")
+        distance = None
+        geo_s = 0.0
+        
+        logger.debug(f"Processing result {i+1}: id={r['id']}, payload_keys={list(payload.keys())}")
+        
+        if user_lat is not None and user_lon is not None and meta_lat is not None and meta_lon is not None:
+            distance = haversine_km(user_lat, user_lon, float(meta_lat), float(meta_lon))
+            geo_s = geo_score(distance)
+            logger.debug(f"  Distance: {distance:.2f}km, geo_score: {geo_s:.4f}")
+        else:
+            logger.debug(f"  No location data - user=({user_lat}, {user_lon}), spot=({meta_lat}, {meta_lon})")
+            
+        traffic_est = payload.get("precomputed_traffic", 0.0) or 0.0
+        traffic_norm = normalize(traffic_est, TRAFFIC_MIN, TRAFFIC_MAX)
+        sem_score = r.get("score", 0.0)
+        fscore = final_score(semantic=sem_score, geo=geo_s, traffic=traffic_norm)
+        
+        logger.debug(f"  Scores - semantic: {sem_score:.4f}, geo: {geo_s:.4f}, traffic: {traffic_norm:.4f}, final: {fscore:.4f}")
+        
+        processed.append(
+            {
+                "id": r["id"],
+                "title": payload.get("title"),
+                "description": payload.get("description"),
+                "category_tags": payload.get("category_tags"),
+                "lat": float(meta_lat) if meta_lat is not None else None,
+                "lon": float(meta_lon) if meta_lon is not None else None,
+                "distance_km": distance,
+                "semantic_score": sem_score,
+                "traffic_estimate": traffic_est,
+                "traffic_confidence": payload.get("traffic_confidence", "low"),
+                "final_score": fscore,
+                "collection": r.get("collection"),
+            }
+        )
+
+    return sorted(processed, key=lambda x: x["final_score"], reverse=True)
+
+
+def _hydrate(results: List[Dict[str, Any]], deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+    """
+    Fills title, description and category_tags for the final results with one
+    batched payload lookup per collection. Results whose point no longer exists
+    (deleted between the search and the lookup) are dropped.
+    """
+    by_collection: Dict[str, List[str]] = {}
+    for r in results:
+        by_collection.setdefault(r["collection"], []).append(r["id"])
+
+    payloads: Dict[str, Dict] = {}
+    for name, ids in by_collection.items():
+        payloads.update(fetch_payloads(ids, collection_name=name, deadline=deadline, caller=caller_for(name)))
+
+    hydrated = []
+    for r in results:
+        payload = payloads.get(r["id"])
+        if payload is None:
+            continue
+        r["title"] = payload.get("title")
+        r["description"] = payload.get("description")
+        r["category_tags"] = payload.get("category_tags")
+        hydrated.append(r)
+
+    missing = [r["id"] for r in results if r["id"] not in payloads]
+    if missing:
+        logger.warning(f"Dropping {len(missing)} results whose points no longer exist: {missing}")
+    return hydrated
+
+
+def _shards(
+    user_lat: float | None,
+    user_lon: float | None,
+    radius_km: float | None,
+    deadline: Deadline,
+) -> Optional[List[str]]:
+    """Region shards to search, or None when sharding is disabled."""
+    if not settings.SHARDING_ENABLED:
+        return None
+    shards = shards_for_location(user_lat, user_lon, radius_km, deadline=deadline)
+    logger.info(f"Searching {len(shards)} shards: {shards}")
+    return shards
+
+
+def _mark_degraded(results: List[Dict[str, Any]], reason: str) -> List[Dict[str, Any]]:
+    return [dict(r, degraded=reason) for r in results]
+
 
 def search_spots(
     query: str,
     user_lat: float | None = None,
     user_lon: float | None = None,
     top_k: int = 20,
+    deadline: Optional[Deadline] = None,
+    radius_km: float | None = None,
 ) -> List[Dict[str, Any]]:
     """
     High-level search flow:
       - embed query
-      - query vector DB for top_k semantic candidates
+      - query vector DB for top_k semantic candidates (scoring payload fields only)
       - compute distance and ranking signals if lat/lon present
-      - compute final score and return sorted list
+      - compute final score and sort
+      - fetch display fields for the final results in one batched lookup
+
+    The whole search runs within `deadline` (SEARCH_DEADLINE_S when not given); the
+    embedding stage gets EMBEDDING_DEADLINE_SHARE of it and the vector search the rest.
+    If the embedding provider fails, a cached query embedding or a lexical ranking is
+    used; if the vector DB fails, the last result list for the same request is served.
+    If only the display field lookup fails, the cached list is served when there is one,
+    otherwise the ranked results without display fields ("no_display_fields").
+    Degraded results carry a "degraded" key naming the fallback.
+
+    With SHARDING_ENABLED, only the region shards within radius_km of the user are
+    searched (all shards without a location), in parallel, and the per-shard rankings
+    are k-way merged on final score.
     """
-    logger.info(f"Starting search for query: '{query}', user_location=({user_lat}, {user_lon}), top_k={top_k}")
+    deadline = deadline or Deadline(settings.SEARCH_DEADLINE_S)
+    cache_key = (query, user_lat, user_lon, radius_km, top_k)
+    logger.info(f"Starting search for query: '{query}', user_location=({user_lat}, {user_lon}), top_k={top_k}, budget={deadline.remaining():.2f}s")
     
     try:
         logger.info("Step 1: Creating query embedding")
-        q_emb = embed_text([query], model=settings.EMBEDDING_MODEL)[0]
-        logger.info(f"Query embedding created with dimension {len(q_emb)}")
+        degraded = None
+        try:
+            q_emb = embed_text([query], model=settings.EMBEDDING_MODEL, deadline=deadline.child(settings.EMBEDDING_DEADLINE_SHARE))[0]
+            _query_embeddings.put(query, q_emb)
+            logger.info(f"Query embedding created with dimension {len(q_emb)}")
+        except Exception as e:
+            q_emb = _query_embeddings.get(query)
+            if q_emb is None:
+                logger.warning(f"Embedding unavailable ({e}), falling back to lexical search")
+                shards = _shards(user_lat, user_lon, radius_km, deadline)
+                vec_results = lexical_candidates(query, top_k, deadline=deadline, collections=shards)
+                return _mark_degraded(_score_candidates(vec_results, user_lat, user_lon), "lexical")
+            logger.warning(f"Embedding unavailable ({e}), using cached query embedding")
+            degraded = "cached_embedding"
 
         logger.info("Step 2: Searching vector database")
-        vec_results = search_vectors(query_vector=q_emb, top_k=top_k)
-        logger.info(f"Vector search returned {len(vec_results)} results")
-
-        processed = []
-        TRAFFIC_MIN = 0.0
-        TRAFFIC_MAX = 10000.0
+        try:
+            shards = _shards(user_lat, user_lon, radius_km, deadline)
+            if shards is not None:
+                shard_results = search_shards(q_emb, shards, top_k=top_k, deadline=deadline)
+            else:
+                shard_results = [
+                    search_vectors(
+                        query_vector=q_emb,
+                        top_k=top_k,
+                        deadline=deadline,
+                        payload_fields=SCORING_PAYLOAD_FIELDS,
+                    )
+                ]
+        except Exception as e:
+            cached = _query_results.get(cache_key)
+            if cached is None:
+                raise
+            logger.warning(f"Vector search unavailable ({e}), serving cached results")
+            return _mark_degraded(cached, "cached_results")
+        logger.info(f"Vector search returned {sum(len(r) for r in shard_results)} results from {len(shard_results)} collection(s)")
 
         logger.info("Step 3: Processing and scoring results")
-        for i, r in enumerate(vec_results):
-            payload = r.get("payload", {})
-            meta_lat = payload.get("lat")
-            meta_lon = payload.get("lon")
-            distance = None
-            geo_s = 0.0
-            
-            logger.debug(f"Processing result {i+1}: id={r['id']}, payload_keys={list(payload.keys())}")
-            
-            if user_lat is not None and user_lon is not None and meta_lat is not None and meta_lon is not None:
-                distance = haversine_km(user_lat, user_lon, float(meta_lat), float(meta_lon))
-                geo_s = geo_score(distance)
-                logger.debug(f"  Distance: {distance:.2f}km, geo_score: {geo_s:.4f}")
-            else:
-                logger.debug(f"  No location data - user=({user_lat}, {user_lon}), spot=({meta_lat}, {meta_lon})")
-                
-            traffic_est = payload.get("precomputed_traffic", 0.0) or 0.0
-            traffic_norm = normalize(traffic_est, TRAFFIC_MIN, TRAFFIC_MAX)
-            sem_score = r.get("score", 0.0)
-            fscore = final_score(semantic=sem_score, geo=geo_s, traffic=traffic_norm)
-            
-            logger.debug(f"  Scores - semantic: {sem_score:.4f}, geo: {geo_s:.4f}, traffic: {traffic_norm:.4f}, final: {fscore:.4f}")
-            
-            processed.append(
-                {
-                    "id": r["id"],
-                    "title": payload.get("title"),
-                    "description": payload.get("description"),
-                    "category_tags": payload.get("category_tags"),
-                    "lat": float(meta_lat) if meta_lat is not None else None,
-                    "lon": float(meta_lon) if meta_lon is not None else None,
-                    "distance_km": distance,
-                    "semantic_score": sem_score,
-                    "traffic_estimate": traffic_est,
-                    "traffic_confidence": payload.get("traffic_confidence", "low"),
-                    "final_score": fscore,
-                }
-            )
-
-        processed = sorted(processed, key=lambda x: x["final_score"], reverse=True)
-        logger.info(f"Step 4: Final results - {len(processed)} spots sorted by final score")
+        processed = merge_ranked([_score_candidates(r, user_lat, user_lon) for r in shard_results], top_k)
+
+        logger.info("Step 4: Fetching display fields for final results")
+        try:
+            processed = _hydrate(processed, deadline=deadline)
+        except Exception as e:
+            cached = _query_results.get(cache_key)
+            if cached is not None:
+                logger.warning(f"Display field lookup failed ({e}), serving cached results")
+                return _mark_degraded(cached, "cached_results")
+            logger.warning(f"Display field lookup failed ({e}), serving results without display fields")
+            return _mark_degraded(processed, "no_display_fields")
+        logger.info(f"Step 5: Final results - {len(processed)} spots sorted by final score")
         logger.debug(f"Top 3 final scores: {[p['final_score'] for p in processed[:3]]}")
+
+        if degraded:
+            return _mark_degraded(processed, degraded)
+        _query_results.put(cache_key, processed)
         return processed
         
     except Exception as e:
@@ -0,0 +1,323 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from qdrant_client.http import models as qmodels
+from ..config import settings
+from ..utils.geo import encode_geohash, distance_to_geohash_km
+from .resilience import Deadline, LatencyTracker, ResilientCaller
+from .vectordb import (
+    client,
+    create_collection_if_missing,
+    make_caller,
+    point_ids,
+    search_vectors,
+    vectordb_caller,
+    SCORING_PAYLOAD_FIELDS,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHARD_SEPARATOR = "__gh_"
+
+# Scatter pool; each shard search in turn runs its Qdrant call on its shard caller's own pool
+_shard_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="shard")
+
+_registry: Dict[str, str] = {}
+_registry_loaded_at = 0.0
+_registry_refreshing = False
+_registry_lock = threading.Lock()
+
+# One caller (circuit breaker + latency trackers) per shard, so a failing or
+# just-deleted shard cannot open the circuit for every other Qdrant call
+_shard_callers: Dict[str, ResilientCaller] = {}
+_shard_callers_lock = threading.Lock()
+
+_shard_latency: Dict[str, LatencyTracker] = {}
+_shard_errors: Dict[str, int] = {}
+_metrics_lock = threading.Lock()
+
+
+def shard_collection_name(prefix: str, base: str = None) -> str:
+    return f"{base or settings.QDRANT_COLLECTION}{SHARD_SEPARATOR}{prefix}"
+
+
+def is_shard(collection_name: str) -> bool:
+    return SHARD_SEPARATOR in (collection_name or "")
+
+
+def caller_for(collection_name: str) -> ResilientCaller:
+    """The per-shard resilient caller for a shard collection, the shared one otherwise."""
+    if not is_shard(collection_name):
+        return vectordb_caller
+    with _shard_callers_lock:
+        if collection_name not in _shard_callers:
+            _shard_callers[collection_name] = make_caller(collection_name)
+        return _shard_callers[collection_name]
+
+
+def list_shards(refresh: bool = False, base: str = None, deadline: Optional[Deadline] = None) -> Dict[str, str]:
+    """
+    Returns {geohash prefix: collection name} for every shard of the base collection.
+    The mapping is read from Qdrant's collection list and cached for SHARD_REGISTRY_TTL_S.
+
+    Only one request refreshes a stale registry at a time, the others keep using the
+    cached one. If a refresh fails, the last good registry is served; the error is
+    raised only when no registry has been loaded yet.
+    """
+    global _registry, _registry_loaded_at, _registry_refreshing
+    base = base or settings.QDRANT_COLLECTION
+    with _registry_lock:
+        loaded = _registry_loaded_at > 0
+        stale = time.monotonic() - _registry_loaded_at > settings.SHARD_REGISTRY_TTL_S
+        if not refresh and loaded and (not stale or _registry_refreshing):
+            return dict(_registry)
+        _registry_refreshing = True
+
+    try:
+        collections = vectordb_caller.call(
+            lambda timeout_s: client.get_collections().collections,
+            deadline or Deadline(settings.UPSTREAM_TIMEOUT_S),
+            operation="list_collections",
+        )
+    except Exception as e:
+        with _registry_lock:
+            _registry_refreshing = False
+            if _registry_loaded_at <= 0:
+                raise
+            logger.warning(f"Shard registry refresh failed ({e}), using last known {len(_registry)} shards")
+            return dict(_registry)
+
+    marker = f"{base}{SHARD_SEPARATOR}"
+    registry = {c.name[len(marker):]: c.name for c in collections if c.name.startswith(marker)}
+    with _registry_lock:
+        _registry = registry
+        _registry_loaded_at = time.monotonic()
+        _registry_refreshing = False
+    logger.info(f"Loaded {len(registry)} shards for '{base}': {sorted(registry)}")
+    return dict(registry)
+
+
+def route_spot(lat: float, lon: float) -> str:
+    """
+    Returns the shard collection a spot at lat/lon belongs to, creating it if needed.
+    The longest existing prefix wins, so spots follow a region after it has been split.
+    A shard that already has child shards is being (or has been) split, so new spots
+    in its region go to a child shard instead.
+    """
+    geohash = encode_geohash(lat, lon)
+    shards = list_shards()
+    matches = [p for p in shards if geohash.startswith(p)]
+    best = max(matches, key=len) if matches else None
+    if best is not None and not any(len(p) > len(best) and p.startswith(best) for p in shards):
+        return shards[best]
+
+    # Create a sibling at the depth of the existing child shards
+    length = len(best) + 1 if best is not None else settings.SHARD_GEOHASH_PRECISION
+    while any(len(p) > length and p.startswith(geohash[:length]) for p in shards):
+        length += 1
+    prefix = geohash[:length]
+    name = shard_collection_name(prefix)
+    logger.info(f"Creating shard '{name}' for location ({lat}, {lon})")
+    create_collection_if_missing(collection_name=name, vector_size=settings.EMBEDDING_DIM)
+    list_shards(refresh=True)
+    return name
+
+
+def shards_for_location(
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[str]:
+    """
+    Returns the shard collections whose region lies within radius_km of lat/lon,
+    or every shard when no location is given.
+    """
+    shards = list_shards(deadline=deadline)
+    if lat is None or lon is None or radius_km is None:
+        return list(shards.values())
+    return [name for prefix, name in shards.items() if distance_to_geohash_km(lat, lon, prefix) <= radius_km]
+
+
+def _record_shard(name: str, seconds: Optional[float]):
+    with _metrics_lock:
+        if seconds is None:
+            _shard_errors[name] = _shard_errors.get(name, 0) + 1
+            return
+        _shard_latency.setdefault(name, LatencyTracker(window=500, min_samples=1)).record(seconds)
+
+
+def _search_shard(name: str, query_vector: List[float], top_k: int, deadline: Optional[Deadline]) -> List[Dict]:
+    start = time.monotonic()
+    try:
+        results = search_vectors(
+            query_vector=query_vector,
+            top_k=top_k,
+            collection_name=name,
+            deadline=deadline,
+            payload_fields=SCORING_PAYLOAD_FIELDS,
+            caller=caller_for(name),
+        )
+    except Exception:
+        _record_shard(name, None)
+        raise
+    _record_shard(name, time.monotonic() - start)
+    return results
+
+
+def search_shards(
+    query_vector: List[float],
+    collections: List[str],
+    top_k: int = 10,
+    deadline: Optional[Deadline] = None,
+) -> List[List[Dict]]:
+    """
+    Searches the given shards in parallel and returns one result list per shard that answered.
+    Only SCORING_PAYLOAD_FIELDS are returned for each candidate.
+    A failing shard is logged and skipped; the search only fails if every shard fails.
+    """
+    logger.info(f"Scatter search over {len(collections)} shards with top_k={top_k}")
+    futures = {name: _shard_executor.submit(_search_shard, name, query_vector, top_k, deadline) for name in collections}
+
+    gathered = []
+    errors = []
+    for name, future in futures.items():
+        try:
+            gathered.append(future.result())
+        except Exception as e:
+            logger.error(f"Shard '{name}' search failed: {e}")
+            errors.append(e)
+
+    if errors and not gathered:
+        raise errors[0]
+    return gathered
+
+
+def shard_metrics() -> Dict[str, Dict]:
+    """
+    Per-shard search latency (p50/p95 in ms over the recent window), sample and error counts.
+    """
+    with _metrics_lock:
+        names = set(_shard_latency) | set(_shard_errors)
+        trackers = dict(_shard_latency)
+        errors = dict(_shard_errors)
+
+    metrics = {}
+    for name in sorted(names):
+        tracker = trackers.get(name)
+        p50 = tracker.percentile(50) if tracker else None
+        p95 = tracker.percentile(95) if tracker else None
+        metrics[name] = {
+            "searches": tracker.count if tracker else 0,
+            "errors": errors.get(name, 0),
+            "p50_ms": p50 * 1000.0 if p50 is not None else None,
+            "p95_ms": p95 * 1000.0 if p95 is not None else None,
+        }
+    return metrics
+
+
+def _copy_to_children(prefix: str, records: List, children: Dict[str, str]) -> int:
+    by_child: Dict[str, List] = {}
+    for r in records:
+        payload = r.payload or {}
+        child = encode_geohash(float(payload["lat"]), float(payload["lon"]), len(prefix) + 1)
+        by_child.setdefault(child, []).append(qmodels.PointStruct(id=r.id, vector=r.vector, payload=payload))
+
+    for child, points in by_child.items():
+        if child not in children:
+            children[child] = shard_collection_name(child)
+            create_collection_if_missing(collection_name=children[child], vector_size=settings.EMBEDDING_DIM)
+        client.upsert(collection_name=children[child], points=points)
+    return len(records)
+
+
+def _split_shard(
+    prefix: str,
+    name: str,
+    batch_size: int,
+    settle_s: float,
+    sleep: Callable[[float], None],
+    max_catch_up_passes: int = 3,
+) -> List[str]:
+    # 1. Copy the parent into child shards one geohash character longer
+    children: Dict[str, str] = {}
+    offset = None
+    moved = 0
+    while True:
+        records, offset = client.scroll(
+            collection_name=name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        moved += _copy_to_children(prefix, records, children)
+        if offset is None or not records:
+            break
+    logger.info(f"Copied {moved} points from '{name}' into {len(children)} child shards")
+
+    # 2. Wait until every API process has reloaded its registry and routes new spots to children
+    list_shards(refresh=True)
+    logger.info(f"Waiting {settle_s:.0f}s for shard registries to pick up the children of '{name}'")
+    sleep(settle_s)
+
+    # 3. Catch up on spots written to the parent while it was being copied
+    for attempt in range(max_catch_up_passes + 1):
+        child_ids = set()
+        for child_name in children.values():
+            child_ids |= point_ids(child_name, batch_size)
+        missing = sorted(point_ids(name, batch_size) - child_ids, key=str)
+        if not missing:
+            break
+        if attempt == max_catch_up_passes:
+            raise RuntimeError(f"Shard '{name}' still has {len(missing)} points missing from its children; not deleting it")
+        logger.info(f"Catch-up: copying {len(missing)} late points from '{name}'")
+        for i in range(0, len(missing), batch_size):
+            records = client.retrieve(collection_name=name, ids=missing[i:i + batch_size], with_payload=True, with_vectors=True)
+            _copy_to_children(prefix, records, children)
+
+    # 4. Drop the parent only once every one of its points is in a child
+    parent_count = client.count(collection_name=name, exact=True).count
+    child_count = sum(client.count(collection_name=c, exact=True).count for c in children.values())
+    if child_count < parent_count:
+        raise RuntimeError(f"Children of '{name}' hold {child_count} points, parent holds {parent_count}; not deleting it")
+    client.delete_collection(collection_name=name)
+    logger.info(f"Deleted parent shard '{name}' ({parent_count} points, children hold {child_count})")
+    return list(children.values())
+
+
+def rebalance(
+    max_points: Optional[int] = None,
+    batch_size: int = 256,
+    settle_s: Optional[float] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, List[str]]:
+    """
+    Splits every shard holding more than max_points (SHARD_MAX_POINTS by default)
+    into child shards one geohash character longer, then drops the parent.
+    Returns {split shard: [child shards]}.
+
+    After the copy it waits settle_s (one SHARD_REGISTRY_TTL_S plus a margin by default)
+    so API processes route new spots to the children, copies any spots that still
+    landed in the parent, and deletes the parent only when the children hold all its points.
+    While a split runs, parent and children can both answer a search;
+    duplicates are dropped when shard results are merged.
+    """
+    max_points = max_points or settings.SHARD_MAX_POINTS
+    settle_s = settings.SHARD_REGISTRY_TTL_S + 5.0 if settle_s is None else settle_s
+    split = {}
+    for prefix, name in list_shards(refresh=True).items():
+        count = client.count(collection_name=name, exact=True).count
+        logger.info(f"Shard '{name}' holds {count} points (limit {max_points})")
+        if count <= max_points:
+            continue
+        try:
+            split[name] = _split_shard(prefix, name, batch_size, settle_s, sleep)
+        except Exception as e:
+            logger.error(f"Failed to split shard '{name}': {e}")
+            raise
+        finally:
+            list_shards(refresh=True)
+    return split
@@ -0,0 +1,61 @@
+from typing import Any, Dict, List
+from ..config import settings
+from ..utils.tiles import TileIndex
+from .sharding import list_shards
+from .vectordb import client
+import logging
+
+logger = logging.getLogger(__name__)
+
+tile_index = TileIndex(
+    max_zoom=settings.TILE_MAX_ZOOM,
+    grid_size=settings.TILE_GRID_SIZE,
+    top_tags=settings.TILE_TOP_TAGS,
+    cache_size=settings.TILE_CACHE_SIZE,
+)
+
+
+def index_spot(spot_id: str, metadata: Dict[str, Any]):
+    """
+    Adds a spot's location, traffic and tags to the tile grid. Spots without coordinates are skipped.
+    """
+    if metadata.get("lat") is None or metadata.get("lon") is None:
+        return
+    tile_index.add(
+        spot_id,
+        lat=metadata["lat"],
+        lon=metadata["lon"],
+        traffic=metadata.get("precomputed_traffic"),
+        tags=metadata.get("category_tags"),
+    )
+
+
+def _collections() -> List[str]:
+    if settings.SHARDING_ENABLED:
+        return list(list_shards(refresh=True).values())
+    return [settings.QDRANT_COLLECTION]
+
+
+def load_tile_index(batch_size: int = 1000) -> int:
+    """
+    Builds the tile grid from every spot in the vector store. Returns the number of indexed spots.
+    """
+    logger.info("Loading tile index from vector store")
+    loaded = 0
+    for name in _collections():
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["lat", "lon", "precomputed_traffic", "category_tags"],
+                with_vectors=False,
+            )
+            for r in records:
+                index_spot(str(r.id), r.payload or {})
+            loaded += len(records)
+            if offset is None or not records:
+                break
+    logger.info(f"Tile index loaded with {len(tile_index)} spots from {loaded} points")
+    return loaded
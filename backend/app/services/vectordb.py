@@ -1,27 +1,173 @@
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
-from typing import Optional, List, Dict, Any
+from qdrant_client.http.exceptions import UnexpectedResponse
+from typing import Optional, List, Dict, Any, Set, Tuple
 from ..config import settings
+from ..utils.vectors import supports_truncation, truncate_embedding
+from .resilience import CircuitBreaker, Deadline, ResilientCaller
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 client = QdrantClient(url=str(settings.QDRANT_URL), prefer_grpc=False, api_key=settings.QDRANT_API_KEY)
 
+FULL_VECTOR_NAME = "full"
+COARSE_VECTOR_NAME = "coarse"
 
-def ensure_collection(collection_name: str = None, vector_size: int = 1536):
-    name = collection_name or settings.QDRANT_COLLECTION
-    logger.info(f"Ensuring collection '{name}' exists with vector size {vector_size}")
+SEARCH_MODE_FULL = "full"
+SEARCH_MODE_TWO_STAGE = "two_stage"
+
+# Payload fields ranking needs for every candidate vs. fields only shown for the final top_k
+SCORING_PAYLOAD_FIELDS = ["lat", "lon", "precomputed_traffic", "traffic_confidence"]
+DISPLAY_PAYLOAD_FIELDS = ["title", "description", "category_tags"]
+# Model a point's vector was embedded with, so re-embedding can find points written with another one
+EMBEDDING_MODEL_FIELD = "embedding_model"
+
+def make_caller(name: str) -> ResilientCaller:
+    """Resilient caller with its own circuit breaker, configured from settings."""
+    return ResilientCaller(
+        name,
+        breaker=CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout_s=settings.CIRCUIT_RESET_S,
+        ),
+        max_retries=settings.UPSTREAM_MAX_RETRIES,
+        backoff_s=settings.UPSTREAM_BACKOFF_S,
+        hedge=settings.UPSTREAM_HEDGING,
+        max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY,
+    )
+
+
+vectordb_caller = make_caller("vectordb")
+
+
+def _client_timeout(timeout_s: float) -> int:
+    # Qdrant takes whole seconds; round up so a short budget is not turned into "no timeout"
+    return max(1, int(math.ceil(timeout_s)))
+
+
+def _coarse_dim(coarse_vector_size: Optional[int]) -> int:
+    return settings.COARSE_VECTOR_DIM if coarse_vector_size is None else coarse_vector_size
+
+
+def check_coarse_model(model: Optional[str] = None, coarse_vector_size: Optional[int] = None):
+    """
+    Raises ValueError when a coarse vector is configured for an embedding model whose
+    truncated vectors are not meaningful embeddings (anything but text-embedding-3).
+    """
+    model = model or settings.EMBEDDING_MODEL
+    coarse_dim = _coarse_dim(coarse_vector_size)
+    if coarse_dim > 0 and not supports_truncation(model):
+        raise ValueError(
+            f"COARSE_VECTOR_DIM={coarse_dim} truncates embeddings, which only works for text-embedding-3 models; "
+            f"EMBEDDING_MODEL is '{model}'. Set COARSE_VECTOR_DIM=0"
+        )
+
+
+def build_vectors_config(vector_size: int = 1536, coarse_vector_size: Optional[int] = None):
+    """
+    Single unnamed vector when the coarse vector is disabled, otherwise a named
+    full-size vector plus a named reduced-dimension coarse vector.
+    """
+    coarse_dim = _coarse_dim(coarse_vector_size)
+    if coarse_dim <= 0:
+        return qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE)
+    return {
+        FULL_VECTOR_NAME: qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
+        COARSE_VECTOR_NAME: qmodels.VectorParams(size=coarse_dim, distance=qmodels.Distance.COSINE),
+    }
+
+
+def build_point_vector(embedding: List[float], coarse_vector_size: Optional[int] = None):
+    """
+    Vector value for a point, matching the layout produced by build_vectors_config.
+    """
+    coarse_dim = _coarse_dim(coarse_vector_size)
+    if coarse_dim <= 0:
+        return embedding
+    return {
+        FULL_VECTOR_NAME: embedding,
+        COARSE_VECTOR_NAME: truncate_embedding(embedding, coarse_dim),
+    }
+
+
+def resolve_collection(name: str = None) -> str:
+    """
+    Returns the concrete collection an alias points to, or `name` itself when it is not an alias.
+    """
+    name = name or settings.QDRANT_COLLECTION
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name
+
+
+def swap_alias(alias_name: str, collection_name: str) -> Optional[str]:
+    """
+    Atomically point `alias_name` at `collection_name`.
+    Returns the collection the alias pointed to before, or None if it did not exist.
+    """
+    previous = resolve_collection(alias_name)
+    previous = previous if previous != alias_name else None
+    logger.info(f"Switching alias '{alias_name}' from '{previous}' to '{collection_name}'")
+    operations = []
+    if previous is not None:
+        operations.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=alias_name)))
+    operations.append(
+        qmodels.CreateAliasOperation(create_alias=qmodels.CreateAlias(collection_name=collection_name, alias_name=alias_name))
+    )
+    try:
+        client.update_collection_aliases(change_aliases_operations=operations)
+        logger.info(f"Alias '{alias_name}' now points to '{collection_name}'")
+        return previous
+    except Exception as e:
+        logger.error(f"Failed to switch alias '{alias_name}' to '{collection_name}': {e}")
+        raise
+
+
+def check_vector_layout(name: str, vectors, vector_size: int = 1536, coarse_vector_size: Optional[int] = None):
+    """
+    Raises ValueError when a collection's vector config does not match the layout
+    build_vectors_config would create for the current COARSE_VECTOR_DIM.
+    """
+    coarse_dim = _coarse_dim(coarse_vector_size)
+    if coarse_dim <= 0:
+        if isinstance(vectors, dict):
+            raise ValueError(
+                f"Collection '{name}' uses named vectors {sorted(vectors)} but COARSE_VECTOR_DIM is 0; "
+                f"set COARSE_VECTOR_DIM to the collection's coarse size"
+            )
+        return
+
+    if not isinstance(vectors, dict) or FULL_VECTOR_NAME not in vectors or COARSE_VECTOR_NAME not in vectors:
+        raise ValueError(
+            f"Collection '{name}' has a single unnamed vector but COARSE_VECTOR_DIM={coarse_dim} needs "
+            f"'{FULL_VECTOR_NAME}' and '{COARSE_VECTOR_NAME}' named vectors; run migrate_coarse_vectors.py "
+            f"to copy it into a new collection, or set COARSE_VECTOR_DIM=0"
+        )
+    if vectors[COARSE_VECTOR_NAME].size != coarse_dim:
+        raise ValueError(
+            f"Collection '{name}' has a {vectors[COARSE_VECTOR_NAME].size}-dim coarse vector but "
+            f"COARSE_VECTOR_DIM={coarse_dim}; run migrate_coarse_vectors.py with --coarse-dim {coarse_dim}"
+        )
+
+
+def ensure_collection(collection_name: str = None, vector_size: int = 1536, coarse_vector_size: Optional[int] = None):
+    # Resolve aliases so a missing alias target is never "recreated" under the alias name
+    check_coarse_model(coarse_vector_size=coarse_vector_size)
+    name = resolve_collection(collection_name or settings.QDRANT_COLLECTION)
+    logger.info(f"Ensuring collection '{name}' exists with vector size {vector_size}, coarse size {_coarse_dim(coarse_vector_size)}")
     try:
         info = client.get_collection(name)
         logger.info(f"Collection '{name}' already exists: {info}")
-        return info
     except Exception as e:
         logger.warning(f"Collection '{name}' not found, creating it. Error: {e}")
         try:
             client.recreate_collection(
                 collection_name=name,
-                vectors_config=qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
+                vectors_config=build_vectors_config(vector_size, coarse_vector_size),
             )
             info = client.get_collection(name)
             logger.info(f"Successfully created collection '{name}': {info}")
@@ -30,17 +176,82 @@ def ensure_collection(collection_name: str = None, vector_size: int = 1536):
             logger.error(f"Failed to create collection '{name}': {create_error}")
             raise
 
+    try:
+        check_vector_layout(name, info.config.params.vectors, vector_size, coarse_vector_size)
+    except ValueError as e:
+        logger.error(f"Collection '{name}' has an incompatible vector layout: {e}")
+        raise
+    return info
+
+
+def _already_exists(error: Exception) -> bool:
+    # Qdrant answers 409 Conflict, older versions 400 with "already exists" in the body
+    if isinstance(error, UnexpectedResponse) and error.status_code == 409:
+        return True
+    return "already exists" in str(error)
+
+
+def create_collection_if_missing(collection_name: str, vector_size: int = 1536, coarse_vector_size: Optional[int] = None):
+    """
+    Creates a collection unless it exists and checks its vector layout. Unlike
+    ensure_collection it never recreates: when several processes create the same
+    collection at once they all succeed, and none drops points another already wrote.
+    """
+    check_coarse_model(coarse_vector_size=coarse_vector_size)
+    try:
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=build_vectors_config(vector_size, coarse_vector_size),
+        )
+        logger.info(f"Created collection '{collection_name}'")
+    except Exception as e:
+        if not _already_exists(e):
+            logger.error(f"Failed to create collection '{collection_name}': {e}")
+            raise
+        logger.info(f"Collection '{collection_name}' already exists")
+
+    info = client.get_collection(collection_name)
+    check_vector_layout(collection_name, info.config.params.vectors, vector_size, coarse_vector_size)
+    return info
+
+
+def point_ids(collection_name: str, batch_size: int = 256) -> Set:
+    """Ids of every point in a collection, scrolled without payloads or vectors."""
+    ids = set()
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids.update(r.id for r in records)
+        if offset is None or not records:
+            return ids
+
 
 def upsert_spot(
     spot_id: str,
     embedding: List[float],
     metadata: Dict[str, Any],
     collection_name: str = None,
+    coarse_vector_size: Optional[int] = None,
+    model: Optional[str] = None,
 ):
+    """
+    Stores a spot; its payload records the model the embedding came from
+    (EMBEDDING_MODEL unless `model` is given).
+    """
     name = collection_name or settings.QDRANT_COLLECTION
     logger.info(f"Upserting spot '{spot_id}' to collection '{name}' with metadata keys: {list(metadata.keys())}")
     try:
-        point = qmodels.PointStruct(id=spot_id, vector=embedding, payload=metadata)
+        point = qmodels.PointStruct(
+            id=spot_id,
+            vector=build_point_vector(embedding, coarse_vector_size),
+            payload=dict(metadata, **{EMBEDDING_MODEL_FIELD: model or settings.EMBEDDING_MODEL}),
+        )
         result = client.upsert(collection_name=name, points=[point])
         logger.info(f"Successfully upserted spot '{spot_id}': {result}")
         return result
@@ -54,26 +265,74 @@ def search_vectors(
     top_k: int = 10,
     collection_name: str = None,
     filter_payload: Optional[Dict] = None,
+    mode: Optional[str] = None,
+    coarse_vector_size: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    payload_fields: Optional[List[str]] = None,
+    caller: Optional[ResilientCaller] = None,
 ) -> List[Dict]:
     """
-    Returns list of results with fields: id, score, payload (metadata)
+    Returns list of results with fields: id, score, payload (metadata), collection
+
+    `payload_fields` limits the returned payload to those keys (full payload when None).
+    `caller` overrides the shared vectordb_caller, e.g. with a per-shard one.
+
+    When the collection carries a coarse vector, mode "two_stage" first searches the
+    coarse vector for top_k * oversampling candidates and then rescores them against
+    the full vector; mode "full" searches the full vector directly.
     """
     name = collection_name or settings.QDRANT_COLLECTION
-    logger.info(f"Searching vectors in collection '{name}' with top_k={top_k}, vector_dim={len(query_vector)}")
+    coarse_dim = _coarse_dim(coarse_vector_size)
+    mode = mode or settings.SEARCH_MODE
+    logger.info(f"Searching vectors in collection '{name}' with top_k={top_k}, vector_dim={len(query_vector)}, coarse_dim={coarse_dim}, mode={mode}")
     
-    try:
-        resp = client.search(
+    oversampling = oversampling or settings.COARSE_OVERSAMPLING
+    with_payload = payload_fields if payload_fields is not None else True
+
+    def _query(timeout_s: float):
+        if coarse_dim <= 0:
+            return client.search(
+                collection_name=name,
+                query_vector=query_vector,
+                limit=top_k,
+                with_payload=with_payload,
+                with_vectors=False,
+                timeout=_client_timeout(timeout_s),
+            )
+        if mode == SEARCH_MODE_TWO_STAGE:
+            candidate_limit = max(top_k, int(round(top_k * oversampling)))
+            logger.info(f"Two-stage search: {candidate_limit} coarse candidates rescored on full vector")
+            return client.query_points(
+                collection_name=name,
+                prefetch=qmodels.Prefetch(
+                    query=truncate_embedding(query_vector, coarse_dim),
+                    using=COARSE_VECTOR_NAME,
+                    limit=candidate_limit,
+                ),
+                query=query_vector,
+                using=FULL_VECTOR_NAME,
+                limit=top_k,
+                with_payload=with_payload,
+                with_vectors=False,
+                timeout=_client_timeout(timeout_s),
+            ).points
+        return client.search(
             collection_name=name,
-            query_vector=query_vector,
+            query_vector=qmodels.NamedVector(name=FULL_VECTOR_NAME, vector=query_vector),
             limit=top_k,
-            with_payload=True,
+            with_payload=with_payload,
             with_vectors=False,
+            timeout=_client_timeout(timeout_s),
         )
+
+    try:
+        resp = (caller or vectordb_caller).call(_query, deadline or Deadline(settings.UPSTREAM_TIMEOUT_S), operation="search")
         logger.info(f"Qdrant search returned {len(resp)} results")
         
         results = []
         for i, r in enumerate(resp):
-            result = {"id": str(r.id), "score": float(r.score), "payload": r.payload}
+            result = {"id": str(r.id), "score": float(r.score), "payload": r.payload or {}, "collection": name}
             results.append(result)
             logger.debug(f"Result {i+1}: id={result['id']}, score={result['score']:.4f}, payload_keys={list(result['payload'].keys())}")
         
@@ -83,3 +342,70 @@ def search_vectors(
     except Exception as e:
         logger.error(f"Failed to search vectors in collection '{name}': {e}")
         raise
+
+
+def scroll_payloads(
+    limit: int = 1000,
+    offset: Any = None,
+    collection_name: str = None,
+    deadline: Optional[Deadline] = None,
+    caller: Optional[ResilientCaller] = None,
+) -> Tuple[List[Dict], Any]:
+    """
+    Returns one page of up to `limit` points starting at `offset`, as results with fields
+    id, payload (metadata), collection, and the offset of the next page (None at the end).
+    Used by the degraded lexical search when the embedding provider is unavailable.
+    """
+    name = collection_name or settings.QDRANT_COLLECTION
+    logger.info(f"Scrolling up to {limit} payloads from collection '{name}' at offset {offset}")
+
+    def _scroll(timeout_s: float):
+        return client.scroll(
+            collection_name=name,
+            limit=limit,
+            offset=offset,
+            with_payload=SCORING_PAYLOAD_FIELDS + DISPLAY_PAYLOAD_FIELDS,
+            with_vectors=False,
+            timeout=_client_timeout(timeout_s),
+        )
+
+    try:
+        records, next_offset = (caller or vectordb_caller).call(_scroll, deadline or Deadline(settings.UPSTREAM_TIMEOUT_S), operation="scroll")
+        return [{"id": str(r.id), "payload": r.payload or {}, "collection": name} for r in records], next_offset
+    except Exception as e:
+        logger.error(f"Failed to scroll payloads in collection '{name}': {e}")
+        raise
+
+
+def fetch_payloads(
+    ids: List[str],
+    fields: Optional[List[str]] = None,
+    collection_name: str = None,
+    deadline: Optional[Deadline] = None,
+    caller: Optional[ResilientCaller] = None,
+) -> Dict[str, Dict]:
+    """
+    Batched lookup of payload `fields` (DISPLAY_PAYLOAD_FIELDS by default) for the given point ids.
+    Returns {id: payload}; ids that no longer exist are missing from the result.
+    """
+    name = collection_name or settings.QDRANT_COLLECTION
+    fields = fields or DISPLAY_PAYLOAD_FIELDS
+    logger.info(f"Fetching payload fields {fields} for {len(ids)} points from collection '{name}'")
+    if not ids:
+        return {}
+
+    def _retrieve(timeout_s: float):
+        return client.retrieve(
+            collection_name=name,
+            ids=ids,
+            with_payload=fields,
+            with_vectors=False,
+            timeout=_client_timeout(timeout_s),
+        )
+
+    try:
+        records = (caller or vectordb_caller).call(_retrieve, deadline or Deadline(settings.UPSTREAM_TIMEOUT_S), operation="retrieve")
+        return {str(r.id): r.payload or {} for r in records}
+    except Exception as e:
+        logger.error(f"Failed to fetch payloads from collection '{name}': {e}")
+        raise
@@ -1,5 +1,7 @@
 import math
 
+MAX_MERCATOR_LAT = 85.05112878
+
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -13,3 +15,76 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     a = math.sin(dphi / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2.0) ** 2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
+
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, lon: float, precision: int = 12) -> str:
+    """
+    Returns the geohash of a lat/lon point with `precision` characters.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2.0
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_bbox(geohash: str) -> tuple:
+    """
+    Returns the cell of a geohash as (lat_min, lat_max, lon_min, lon_max).
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for ch in geohash:
+        idx = GEOHASH_BASE32.index(ch)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2.0
+            if (idx >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def distance_to_geohash_km(lat: float, lon: float, geohash: str) -> float:
+    """
+    Returns the distance in kilometers from a point to the nearest point of a geohash cell
+    (0 when the point lies inside the cell).
+    """
+    lat_min, lat_max, lon_min, lon_max = geohash_bbox(geohash)
+    nearest_lat = min(max(lat, lat_min), lat_max)
+    nearest_lon = min(max(lon, lon_min), lon_max)
+    return haversine_km(lat, lon, nearest_lat, nearest_lon)
+
+
+def latlon_to_tile_fraction(lat: float, lon: float, zoom: int) -> tuple:
+    """
+    Returns the fractional Web Mercator (slippy map) tile coordinates (x, y) of a point at `zoom`.
+    """
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
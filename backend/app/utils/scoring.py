@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
+import heapq
 import math
 
 
@@ -21,3 +22,20 @@ def normalize(value: Optional[float], min_v=0.0, max_v=1.0) -> float:
 
 def final_score(semantic: float, geo: float, traffic: float, w_sem=0.5, w_geo=0.25, w_traffic=0.25) -> float:
     return w_sem * semantic + w_geo * geo + w_traffic * traffic
+
+
+def merge_ranked(ranked_lists: Iterable[List[Dict]], top_k: int, key: str = "final_score") -> List[Dict]:
+    """
+    k-way merge of result lists that are each sorted by `key` descending.
+    Returns the top_k items overall; an id seen in several lists is kept once.
+    """
+    merged = []
+    seen = set()
+    for item in heapq.merge(*ranked_lists, key=lambda r: r[key], reverse=True):
+        if item["id"] in seen:
+            continue
+        seen.add(item["id"])
+        merged.append(item)
+        if len(merged) >= top_k:
+            break
+    return merged
@@ -0,0 +1,137 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set
+from .cache import LRUCache
+from .geo import latlon_to_tile_fraction
+
+# Deepest zoom served at all; tiles between max_zoom and this return raw spots
+MAX_TILE_ZOOM = 22
+
+
+class TileIndex:
+    """
+    Hierarchical grid of spot clusters for slippy-map tiles.
+
+    Every tile at zoom z is divided into grid_size x grid_size cells; each cell keeps
+    the count, coordinate sums, traffic sum and tag counts of the spots inside it, for
+    every zoom from 0 to max_zoom. Adding or removing a spot touches one cell per zoom,
+    and only the tiles holding those cells are evicted from the per-tile cache.
+
+    Each zoom level costs an aggregate per occupied cell, and deep zooms hold about one
+    per spot, so clustering stops at max_zoom. Above it a tile lists its spots one by one,
+    looked up through the spot ids kept per max_zoom tile.
+    """
+
+    def __init__(self, max_zoom: int = 12, grid_size: int = 8, top_tags: int = 3, cache_size: int = 2048):
+        self.max_zoom = max_zoom
+        self.grid_size = grid_size
+        self.top_tags = top_tags
+        # cells[z][(tile_x, tile_y)][(cell_x, cell_y)] -> aggregate
+        self._cells: List[Dict] = [dict() for _ in range(max_zoom + 1)]
+        self._spots: Dict[str, tuple] = {}
+        # (tile_x, tile_y) at max_zoom -> ids of the spots inside it
+        self._buckets: Dict[tuple, Set[str]] = {}
+        self._cache = LRUCache(cache_size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._spots)
+
+    def _cell(self, lat: float, lon: float, zoom: int) -> tuple:
+        limit = (2 ** zoom) * self.grid_size - 1
+        fx, fy = latlon_to_tile_fraction(lat, lon, zoom)
+        cx = min(max(int(fx * self.grid_size), 0), limit)
+        cy = min(max(int(fy * self.grid_size), 0), limit)
+        return (cx // self.grid_size, cy // self.grid_size), (cx, cy)
+
+    def _apply(self, spot_id: str, spot: tuple, sign: int):
+        lat, lon, traffic, tags = spot
+        bucket, _ = self._cell(lat, lon, self.max_zoom)
+        if sign > 0:
+            self._buckets.setdefault(bucket, set()).add(spot_id)
+        else:
+            self._buckets[bucket].discard(spot_id)
+            if not self._buckets[bucket]:
+                del self._buckets[bucket]
+        for zoom in range(self.max_zoom + 1):
+            tile, cell = self._cell(lat, lon, zoom)
+            cells = self._cells[zoom].setdefault(tile, {})
+            agg = cells.setdefault(cell, {"count": 0, "sum_lat": 0.0, "sum_lon": 0.0, "sum_traffic": 0.0, "tags": Counter()})
+            agg["count"] += sign
+            agg["sum_lat"] += sign * lat
+            agg["sum_lon"] += sign * lon
+            agg["sum_traffic"] += sign * traffic
+            if sign > 0:
+                agg["tags"].update(tags)
+            else:
+                agg["tags"].subtract(tags)
+            if agg["count"] <= 0:
+                del cells[cell]
+                if not cells:
+                    del self._cells[zoom][tile]
+            self._cache.pop((zoom,) + tile)
+
+    def add(self, spot_id: str, lat: float, lon: float, traffic: Optional[float] = None, tags: Optional[List[str]] = None):
+        """Adds a spot, replacing any earlier entry with the same id."""
+        spot = (float(lat), float(lon), float(traffic or 0.0), list(tags or []))
+        with self._lock:
+            previous = self._spots.get(spot_id)
+            if previous is not None:
+                self._apply(spot_id, previous, -1)
+            self._spots[spot_id] = spot
+            self._apply(spot_id, spot, 1)
+
+    def remove(self, spot_id: str):
+        with self._lock:
+            previous = self._spots.pop(spot_id, None)
+            if previous is not None:
+                self._apply(spot_id, previous, -1)
+
+    def tile(self, z: int, x: int, y: int) -> Dict:
+        """
+        Returns {"z", "x", "y", "total", "clusters"} for one tile; clusters carry
+        count, centroid lat/lon, avg_traffic and top_tags. Above max_zoom every
+        cluster is a single spot.
+        """
+        if not 0 <= z <= MAX_TILE_ZOOM:
+            raise ValueError(f"Zoom must be between 0 and {MAX_TILE_ZOOM}")
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError(f"Tile ({x}, {y}) is outside zoom level {z}")
+        if z > self.max_zoom:
+            return self._raw_tile(z, x, y)
+
+        key = (z, x, y)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            clusters = []
+            for agg in self._cells[z].get((x, y), {}).values():
+                count = agg["count"]
+                clusters.append(
+                    {
+                        "count": count,
+                        "lat": agg["sum_lat"] / count,
+                        "lon": agg["sum_lon"] / count,
+                        "avg_traffic": agg["sum_traffic"] / count,
+                        "top_tags": [t for t, n in agg["tags"].most_common(self.top_tags) if n > 0],
+                    }
+                )
+            clusters.sort(key=lambda c: c["count"], reverse=True)
+            result = {"z": z, "x": x, "y": y, "total": sum(c["count"] for c in clusters), "clusters": clusters}
+            self._cache.put(key, result)
+        return result
+
+    def _raw_tile(self, z: int, x: int, y: int) -> Dict:
+        # Not cached: the max_zoom bucket holds few spots and changes are not tracked this deep
+        shift = z - self.max_zoom
+        with self._lock:
+            spots = [self._spots[i] for i in self._buckets.get((x >> shift, y >> shift), ())]
+        clusters = []
+        for lat, lon, traffic, tags in spots:
+            tile, _ = self._cell(lat, lon, z)
+            if tile == (x, y):
+                clusters.append({"count": 1, "lat": lat, "lon": lon, "avg_traffic": traffic, "top_tags": tags[:self.top_tags]})
+        clusters.sort(key=lambda c: c["avg_traffic"], reverse=True)
+        return {"z": z, "x": x, "y": y, "total": len(clusters), "clusters": clusters}
@@ -0,0 +1,23 @@
+import math
+from typing import List
+
+# Models trained so that the leading components of an embedding are themselves a usable
+# lower-dimension embedding (Matryoshka representation learning)
+TRUNCATABLE_MODEL_PREFIXES = ("text-embedding-3-",)
+
+
+def supports_truncation(model: str) -> bool:
+    return (model or "").startswith(TRUNCATABLE_MODEL_PREFIXES)
+
+
+def truncate_embedding(vector: List[float], dim: int) -> List[float]:
+    """
+    Shorten an embedding to its first `dim` components and re-normalize to unit length.
+    text-embedding-3 models are trained so that a truncated, re-normalized vector matches
+    what the API returns when asked for `dimensions=dim`.
+    """
+    head = list(vector[:dim])
+    norm = math.sqrt(sum(v * v for v in head))
+    if norm == 0:
+        return head
+    return [v / norm for v in head]
@@ -0,0 +1,104 @@
+import sys
+import os
+import time
+import logging
+import argparse
+from typing import List, Dict
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.embeddings import embed_text
+from app.services.vectordb import search_vectors, SEARCH_MODE_FULL, SEARCH_MODE_TWO_STAGE
+from app.config import settings
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES = [
+    "I want to advertise a football kit near stadiums",
+    "Best place for luxury brand advertising in London",
+    "Shopping center advertising for fashion brand",
+    "Reach commuters at busy railway stations",
+    "Promote a travel app to international passengers",
+    "Student discounts campaign near universities",
+    "Concert tickets promotion at big entertainment venues",
+    "High footfall city center spots in Manchester",
+]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _timed_search(query_vector: List[float], top_k: int, mode: str, oversampling: float, repeats: int):
+    latencies = []
+    results = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = search_vectors(query_vector=query_vector, top_k=top_k, mode=mode, oversampling=oversampling)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return [r["id"] for r in results], latencies
+
+
+def compare_modes(queries: List[str], top_k: int, oversampling: float, repeats: int) -> Dict:
+    """
+    Run every query in full and two-stage mode. Recall is measured against the
+    full-vector result list for the same query.
+    """
+    query_vectors = embed_text(queries, model=settings.EMBEDDING_MODEL)
+
+    full_latencies: List[float] = []
+    two_stage_latencies: List[float] = []
+    recalls: List[float] = []
+    for query, q_emb in zip(queries, query_vectors):
+        full_ids, full_lat = _timed_search(q_emb, top_k, SEARCH_MODE_FULL, oversampling, repeats)
+        coarse_ids, coarse_lat = _timed_search(q_emb, top_k, SEARCH_MODE_TWO_STAGE, oversampling, repeats)
+        full_latencies.extend(full_lat)
+        two_stage_latencies.extend(coarse_lat)
+
+        recall = len(set(full_ids) & set(coarse_ids)) / len(full_ids) if full_ids else 1.0
+        recalls.append(recall)
+        logger.info(f"'{query}': recall@{top_k}={recall:.3f}")
+
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "oversampling": oversampling,
+        "recall_mean": sum(recalls) / len(recalls) if recalls else 0.0,
+        "recall_min": min(recalls) if recalls else 0.0,
+        "full_p50_ms": _percentile(full_latencies, 50),
+        "full_p95_ms": _percentile(full_latencies, 95),
+        "two_stage_p50_ms": _percentile(two_stage_latencies, 50),
+        "two_stage_p95_ms": _percentile(two_stage_latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-vector and coarse-to-fine search on recall and latency.")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=settings.COARSE_OVERSAMPLING)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if settings.COARSE_VECTOR_DIM <= 0:
+        print("COARSE_VECTOR_DIM is not set; run migrate_coarse_vectors.py and configure it first.")
+        return False
+
+    report = compare_modes(SAMPLE_QUERIES, args.top_k, args.oversampling, args.repeats)
+    print(f"Collection: {settings.QDRANT_COLLECTION} (coarse_dim={settings.COARSE_VECTOR_DIM})")
+    print(f"Queries: {report['queries']}, top_k={report['top_k']}, oversampling={report['oversampling']}")
+    print(f"Recall@{report['top_k']} two_stage vs full: mean={report['recall_mean']:.3f}, min={report['recall_min']:.3f}")
+    print(f"Latency full:      p50={report['full_p50_ms']:.1f}ms  p95={report['full_p95_ms']:.1f}ms")
+    print(f"Latency two_stage: p50={report['two_stage_p50_ms']:.1f}ms  p95={report['two_stage_p95_ms']:.1f}ms")
+    return True
+
+
+if __name__ == "__main__":
+    main()
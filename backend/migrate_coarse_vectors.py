@@ -0,0 +1,164 @@
+import sys
+import os
+import logging
+import argparse
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_client.http import models as qmodels
+
+from app.services.vectordb import (
+    client,
+    ensure_collection,
+    build_point_vector,
+    point_ids,
+    resolve_collection,
+    swap_alias,
+    FULL_VECTOR_NAME,
+)
+from app.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _full_vector(vector) -> List[float]:
+    """Return the full-size vector from either a legacy unnamed or a named-vector point."""
+    if isinstance(vector, dict):
+        return vector[FULL_VECTOR_NAME]
+    return vector
+
+
+def _copy_points(records: List, target: str, coarse_dim: int) -> int:
+    points = [
+        qmodels.PointStruct(
+            id=r.id,
+            vector=build_point_vector(_full_vector(r.vector), coarse_dim),
+            payload=r.payload,
+        )
+        for r in records
+    ]
+    client.upsert(collection_name=target, points=points)
+    return len(points)
+
+
+def migrate_collection(source: str, target: str, coarse_dim: int, batch_size: int = 128) -> int:
+    """
+    Copy every point of `source` into `target`, which is created with a named full vector
+    and a named coarse vector. Existing embeddings are reused, so no re-embedding happens.
+    Returns the number of copied points.
+    """
+    logger.info(f"Migrating '{source}' -> '{target}' with coarse_dim={coarse_dim}, batch_size={batch_size}")
+    ensure_collection(collection_name=target, vector_size=settings.EMBEDDING_DIM, coarse_vector_size=coarse_dim)
+
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not records:
+            break
+
+        copied += _copy_points(records, target, coarse_dim)
+        logger.info(f"Copied {copied} points so far")
+
+        if offset is None:
+            break
+
+    logger.info(f"Migration completed: {copied} points copied into '{target}'")
+    return copied
+
+
+def catch_up(source: str, target: str, coarse_dim: int, batch_size: int = 128) -> int:
+    """
+    Copy points that exist in `source` but not in `target`, i.e. spots written through
+    the alias after the main scroll had passed their id. Returns the number copied.
+    """
+    missing = sorted(point_ids(source, batch_size) - point_ids(target, batch_size), key=str)
+    logger.info(f"Catch-up: {len(missing)} points in '{source}' are missing from '{target}'")
+    for i in range(0, len(missing), batch_size):
+        records = client.retrieve(collection_name=source, ids=missing[i:i + batch_size], with_payload=True, with_vectors=True)
+        if records:
+            _copy_points(records, target, coarse_dim)
+    return len(missing)
+
+
+def switch_alias(
+    alias: str,
+    target: str,
+    coarse_dim: int,
+    batch_size: int = 128,
+    replace_collection: bool = False,
+    max_catch_up_passes: int = 3,
+) -> Optional[str]:
+    """
+    Point `alias` at the migrated collection after copying the spots written during the
+    migration, then copy once more from the previous collection for writes that landed
+    between the last pass and the switch. Returns the previous collection, if any.
+    """
+    source = resolve_collection(alias)
+    # A plain collection cannot coexist with an alias of the same name
+    plain_collection = source == alias
+    if plain_collection and not replace_collection:
+        raise ValueError(f"'{alias}' is a collection, not an alias; rerun with --replace-collection to delete it and create the alias")
+
+    for _ in range(max_catch_up_passes):
+        if catch_up(source, target, coarse_dim, batch_size) == 0:
+            break
+
+    if plain_collection:
+        logger.warning(f"Deleting collection '{alias}' so the alias can take its name; rollback will not be possible")
+        client.delete_collection(collection_name=alias)
+
+    previous = swap_alias(alias, target)
+    if previous is not None:
+        catch_up(previous, target, coarse_dim, batch_size)
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy a collection into a new one with a coarse named vector and switch its alias.")
+    parser.add_argument("--alias", default=settings.QDRANT_COLLECTION)
+    parser.add_argument("--target", default=None, help="New collection name (default: <alias>_coarse)")
+    parser.add_argument("--coarse-dim", type=int, default=settings.COARSE_VECTOR_DIM or 256)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--no-swap", action="store_true", help="Copy only, leave the alias unchanged")
+    parser.add_argument("--replace-collection", action="store_true", help="Allow replacing a plain collection with the alias")
+    args = parser.parse_args()
+
+    try:
+        settings.validate_required_fields()
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        return False
+    if settings.SHARDING_ENABLED:
+        logger.error("Migration works on a single collection and does not support region shards; disable SHARDING_ENABLED")
+        return False
+
+    target = args.target or f"{args.alias}_coarse"
+    try:
+        migrate_collection(resolve_collection(args.alias), target, args.coarse_dim, args.batch_size)
+        if args.no_swap:
+            logger.info(f"Alias '{args.alias}' unchanged; rerun without --no-swap to switch it to '{target}'")
+            return True
+        previous = switch_alias(args.alias, target, args.coarse_dim, args.batch_size, args.replace_collection)
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        return False
+
+    logger.info(f"Alias '{args.alias}' now serves '{target}' (previous: {previous})")
+    logger.info(f"Set COARSE_VECTOR_DIM={args.coarse_dim} and restart the backend to use the coarse vector")
+    return True
+
+
+if __name__ == "__main__":
+    main()
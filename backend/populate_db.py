@@ -7,7 +7,8 @@ import uuid
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.vectordb import ensure_collection, upsert_spot
-from app.services.embeddings import embed_text
+from app.services.sharding import route_spot
+from app.services.embeddings import embed_text, spot_embedding_text
 from app.config import settings
 
 logging.basicConfig(
@@ -143,12 +144,7 @@ def create_spot_embeddings(spots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Create embeddings for spot descriptions and titles."""
     logger.info(f"Creating embeddings for {len(spots)} spots")
     
-    texts = []
-    for spot in spots:
-        text = f"{spot['title']} {spot['description']}"
-        if spot.get('category_tags'):
-            text += " " + " ".join(spot['category_tags'])
-        texts.append(text)
+    texts = [spot_embedding_text(spot) for spot in spots]
     
     try:
         embeddings = embed_text(texts, model=settings.EMBEDDING_MODEL)
@@ -181,8 +177,9 @@ def populate_database():
         return False
     
     try:
-        logger.info("Ensuring collection exists")
-        ensure_collection(vector_size=1536)
+        if not settings.SHARDING_ENABLED:
+            logger.info("Ensuring collection exists")
+            ensure_collection(vector_size=settings.EMBEDDING_DIM)
         
         spots_with_embeddings = create_spot_embeddings(SAMPLE_SPOTS)
         
@@ -196,7 +193,8 @@ def populate_database():
                 upsert_spot(
                     spot_id=spot_uuid,
                     embedding=spot['embedding'],
-                    metadata=metadata
+                    metadata=metadata,
+                    collection_name=route_spot(spot['lat'], spot['lon']) if settings.SHARDING_ENABLED else None,
                 )
                 logger.info(f"Successfully inserted spot: {spot['title']} (UUID: {spot_uuid})")
             except Exception as e:
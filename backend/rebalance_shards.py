@@ -0,0 +1,49 @@
+import sys
+import os
+import logging
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.sharding import rebalance, list_shards
+from app.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split region shards that hold too many spots.")
+    parser.add_argument("--max-points", type=int, default=settings.SHARD_MAX_POINTS)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--settle-s",
+        type=float,
+        default=None,
+        help="Seconds to wait before the catch-up copy (default: SHARD_REGISTRY_TTL_S + 5)",
+    )
+    args = parser.parse_args()
+
+    try:
+        settings.validate_required_fields()
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        return False
+
+    try:
+        split = rebalance(max_points=args.max_points, batch_size=args.batch_size, settle_s=args.settle_s)
+    except Exception as e:
+        logger.error(f"Rebalance failed: {e}")
+        return False
+
+    for parent, children in split.items():
+        logger.info(f"Split '{parent}' into {children}")
+    logger.info(f"Rebalance completed: {len(split)} shards split, {len(list_shards(refresh=True))} shards in total")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import sys
+import os
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Set
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_client.http import models as qmodels
+
+from app.services.vectordb import (
+    client,
+    ensure_collection,
+    build_point_vector,
+    point_ids,
+    resolve_collection,
+    swap_alias,
+    EMBEDDING_MODEL_FIELD,
+)
+from app.services.embeddings import embed_text, spot_embedding_text
+from app.config import settings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces out calls so that at most `rate` happen per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self._next_at:
+            time.sleep(self._next_at - now)
+        self._next_at = max(now, self._next_at) + self.interval
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _reembed(records: List, target: str, limiter: RateLimiter, model: Optional[str] = None):
+    model = model or settings.EMBEDDING_MODEL
+    limiter.wait()
+    embeddings = embed_text([spot_embedding_text(r.payload or {}) for r in records], model=model)
+    points = [
+        qmodels.PointStruct(
+            id=r.id,
+            vector=build_point_vector(emb),
+            payload=dict(r.payload or {}, **{EMBEDDING_MODEL_FIELD: model}),
+        )
+        for r, emb in zip(records, embeddings)
+    ]
+    client.upsert(collection_name=target, points=points)
+
+
+def _reembed_ids(source: str, ids: List, target: str, limiter: RateLimiter, batch_size: int, model: Optional[str] = None):
+    for i in range(0, len(ids), batch_size):
+        records = client.retrieve(collection_name=source, ids=ids[i:i + batch_size], with_payload=True, with_vectors=False)
+        if records:
+            _reembed(records, target, limiter, model)
+
+
+def _stale_ids(collection_name: str, model: str, batch_size: int) -> Set:
+    """Ids of points whose payload does not record `model` as their embedding model."""
+    ids = set()
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=[EMBEDDING_MODEL_FIELD],
+            with_vectors=False,
+        )
+        ids.update(r.id for r in records if (r.payload or {}).get(EMBEDDING_MODEL_FIELD) != model)
+        if offset is None or not records:
+            return ids
+
+
+def _collection_model(collection_name: str) -> Optional[str]:
+    """Embedding model recorded on a sample point, None for empty or untagged collections."""
+    records, _ = client.scroll(collection_name=collection_name, limit=1, with_payload=[EMBEDDING_MODEL_FIELD], with_vectors=False)
+    return (records[0].payload or {}).get(EMBEDDING_MODEL_FIELD) if records else None
+
+
+def catch_up(source: str, target: str, batch_size: int = 64, rate: float = 2.0, model: Optional[str] = None) -> int:
+    """
+    Re-embed into `target` the points that exist in `source` but not in `target`, i.e. spots
+    written through the alias after the main scroll had passed their id, and the points of
+    `target` embedded with another model than `model` (EMBEDDING_MODEL by default), i.e. spots
+    written after the switch by API processes still running the old model.
+    Returns the number of points re-embedded.
+    """
+    model = model or settings.EMBEDDING_MODEL
+    missing = sorted(point_ids(source, batch_size) - point_ids(target, batch_size), key=str)
+    stale = sorted(_stale_ids(target, model, batch_size), key=str)
+    logger.info(
+        f"Catch-up: {len(missing)} points in '{source}' are missing from '{target}', "
+        f"{len(stale)} points in '{target}' were not embedded with '{model}'"
+    )
+    limiter = RateLimiter(rate)
+    _reembed_ids(source, missing, target, limiter, batch_size, model)
+    _reembed_ids(target, stale, target, limiter, batch_size, model)
+    return len(missing) + len(stale)
+
+
+def reindex(
+    alias: str,
+    target: str,
+    checkpoint_path: str,
+    batch_size: int = 64,
+    rate: float = 2.0,
+    resume: bool = False,
+) -> Dict[str, Any]:
+    """
+    Stream every point of the collection behind `alias` into `target`, re-embedding
+    the payload text with the current EMBEDDING_MODEL. Progress is checkpointed after
+    every batch so an interrupted run can continue with resume=True.
+    """
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state and state["model"] != settings.EMBEDDING_MODEL:
+        # Mixing vectors from two models in one collection would make similarities meaningless
+        raise ValueError(
+            f"Checkpoint was written with model '{state['model']}' but EMBEDDING_MODEL is "
+            f"'{settings.EMBEDDING_MODEL}'; start a new reindex without --resume"
+        )
+    if state:
+        logger.info(f"Resuming reindex from checkpoint: {state['processed']} points done, offset={state['offset']}")
+        target = state["target"]
+    else:
+        source = resolve_collection(alias)
+        state = {
+            "alias": alias,
+            "source": source,
+            "source_model": _collection_model(source) if source != target else None,
+            "target": target,
+            "model": settings.EMBEDDING_MODEL,
+            "offset": None,
+            "processed": 0,
+            "done": False,
+        }
+    source = state["source"]
+    if source == target:
+        raise ValueError(f"Target collection '{target}' is the collection currently behind '{alias}'")
+
+    ensure_collection(collection_name=target, vector_size=settings.EMBEDDING_DIM)
+    total = client.count(collection_name=source, exact=True).count
+    logger.info(f"Reindexing {total} points from '{source}' into '{target}' with model '{settings.EMBEDDING_MODEL}'")
+
+    limiter = RateLimiter(rate)
+    started = time.monotonic()
+    processed_this_run = 0
+    offset = state["offset"]
+    while not state["done"]:
+        records, next_offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if records:
+            _reembed(records, target, limiter)
+            processed_this_run += len(records)
+            state["processed"] += len(records)
+
+        offset = next_offset
+        state["offset"] = offset
+        state["done"] = offset is None or not records
+        save_checkpoint(checkpoint_path, state)
+
+        elapsed = time.monotonic() - started
+        throughput = processed_this_run / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, total - state["processed"])
+        eta = remaining / throughput if throughput > 0 else 0.0
+        logger.info(
+            f"Progress: {state['processed']}/{total} points "
+            f"({100.0 * state['processed'] / total if total else 100.0:.1f}%), "
+            f"{throughput:.1f} points/s, ETA {eta:.0f}s"
+        )
+
+    logger.info(f"Reindex completed: {state['processed']} points in '{target}'")
+    return state
+
+
+def switch_alias(
+    checkpoint_path: str,
+    replace_collection: bool = False,
+    batch_size: int = 64,
+    rate: float = 2.0,
+    max_catch_up_passes: int = 3,
+) -> Dict[str, Any]:
+    """
+    Point the alias at the reindexed collection. The previous collection is kept
+    and recorded in the checkpoint so the switch can be rolled back.
+
+    Spots written through the alias during the reindex are copied over by catch-up
+    passes before the switch, and once more afterwards for writes that landed in
+    the old collection between the last pass and the switch. API processes still
+    running the old EMBEDDING_MODEL keep writing old-model vectors until they are
+    redeployed; run catch_up (--catch-up) again once they are.
+    """
+    state = load_checkpoint(checkpoint_path)
+    if not state or not state.get("done"):
+        raise ValueError("Reindex has not completed; refusing to switch alias")
+
+    alias = state["alias"]
+    # A plain collection cannot coexist with an alias of the same name
+    plain_collection = resolve_collection(alias) == alias
+    if plain_collection and not replace_collection:
+        raise ValueError(f"'{alias}' is a collection, not an alias; rerun with --replace-collection to delete it and create the alias")
+
+    for _ in range(max_catch_up_passes):
+        if catch_up(state["source"], state["target"], batch_size, rate, state["model"]) == 0:
+            break
+
+    if plain_collection:
+        logger.warning(f"Deleting collection '{alias}' so the alias can take its name; rollback will not be possible")
+        client.delete_collection(collection_name=alias)
+
+    state["previous"] = swap_alias(alias, state["target"])
+    save_checkpoint(checkpoint_path, state)
+    if state["previous"] is not None:
+        catch_up(state["previous"], state["target"], batch_size, rate, state["model"])
+    return state
+
+
+def rollback(
+    checkpoint_path: str,
+    previous_model: Optional[str] = None,
+    batch_size: int = 64,
+    rate: float = 2.0,
+) -> Dict[str, Any]:
+    """
+    Point the alias back at the collection it used before the last switch.
+
+    Spots created through the alias since the switch exist only in the current collection;
+    they are re-embedded into the previous one with its model (`previous_model`, or the model
+    recorded for it when the reindex started) before and once more after the alias moves back.
+    Rollback refuses to run when there are such spots and that model is unknown.
+    """
+    state = load_checkpoint(checkpoint_path)
+    if not state or not state.get("previous"):
+        raise ValueError("No previous collection recorded; nothing to roll back to")
+
+    current, previous = state["target"], state["previous"]
+    if previous_model is None and previous == state.get("source"):
+        previous_model = state.get("source_model")
+    written = sorted(point_ids(current, batch_size) - point_ids(previous, batch_size), key=str)
+    if written and previous_model is None:
+        raise ValueError(
+            f"{len(written)} spots were written to '{current}' after the switch and the embedding model of "
+            f"'{previous}' is unknown; rerun with --previous-model to re-embed them"
+        )
+
+    limiter = RateLimiter(rate)
+    logger.info(f"Re-embedding {len(written)} spots written since the switch into '{previous}' with '{previous_model}'")
+    _reembed_ids(current, written, previous, limiter, batch_size, previous_model)
+    swap_alias(state["alias"], previous)
+    late = sorted(point_ids(current, batch_size) - point_ids(previous, batch_size), key=str)
+    _reembed_ids(current, late, previous, limiter, batch_size, previous_model)
+
+    state["previous"], state["target"] = None, previous
+    if previous_model is not None:
+        state["model"] = previous_model
+    save_checkpoint(checkpoint_path, state)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed a collection into a shadow collection and switch its alias.")
+    parser.add_argument("--alias", default=settings.QDRANT_COLLECTION)
+    parser.add_argument("--target", default=None, help="Shadow collection name (default: <alias>_<timestamp>)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=2.0, help="Max embedding requests per second")
+    parser.add_argument("--checkpoint", default="reindex_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint file")
+    parser.add_argument("--no-swap", action="store_true", help="Reindex only, leave the alias unchanged")
+    parser.add_argument("--swap-only", action="store_true", help="Switch the alias for a completed reindex")
+    parser.add_argument("--replace-collection", action="store_true", help="Allow replacing a plain collection with the alias")
+    parser.add_argument("--catch-up", action="store_true", help="Re-embed spots written through the alias since the switch")
+    parser.add_argument("--rollback", action="store_true", help="Point the alias back at the previous collection")
+    parser.add_argument("--previous-model", default=None, help="Embedding model of the previous collection, for --rollback")
+    args = parser.parse_args()
+
+    try:
+        settings.validate_required_fields()
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        return False
+    if settings.SHARDING_ENABLED:
+        logger.error("Reindex works on a single collection and does not support region shards; disable SHARDING_ENABLED")
+        return False
+
+    try:
+        if args.rollback:
+            state = rollback(args.checkpoint, args.previous_model, args.batch_size, args.rate)
+            logger.info(f"Alias '{state['alias']}' rolled back to '{state['target']}'")
+            return True
+
+        if args.catch_up:
+            state = load_checkpoint(args.checkpoint)
+            if not state or not state.get("previous"):
+                raise ValueError("No completed switch recorded; nothing to catch up")
+            copied = catch_up(state["previous"], state["target"], args.batch_size, args.rate, state["model"])
+            logger.info(f"Re-embedded {copied} spots into '{state['target']}'")
+            return True
+
+        if not args.swap_only:
+            target = args.target or f"{args.alias}_{int(time.time())}"
+            reindex(args.alias, target, args.checkpoint, args.batch_size, args.rate, args.resume)
+
+        if not args.no_swap:
+            state = switch_alias(args.checkpoint, args.replace_collection, args.batch_size, args.rate)
+            logger.info(f"Alias '{state['alias']}' now serves '{state['target']}' (previous: {state['previous']})")
+        return True
+    except Exception as e:
+        logger.error(f"Reindex failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
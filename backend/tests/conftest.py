@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from qdrant_client.http import models as qmodels
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+
+class FakeQdrant:
+    """In-memory stand-in for the parts of QdrantClient the backend scripts and services use."""
+
+    def __init__(self, collections=None, aliases=None):
+        # {collection: {point id: {"payload": ..., "vector": ...}}}
+        self.collections = collections or {}
+        self.aliases = aliases or {}
+        self.vector_configs = {}
+        self.alias_operations = []
+        self.fail_get_collections = False
+        self.get_collections_calls = 0
+        self.on_scroll = None
+
+    def _resolve(self, name):
+        return self.aliases.get(name, name)
+
+    @staticmethod
+    def _record(points, i, with_payload=True, with_vectors=False):
+        return SimpleNamespace(
+            id=i,
+            payload=points[i]["payload"] if with_payload else None,
+            vector=points[i]["vector"] if with_vectors else None,
+        )
+
+    def get_collections(self):
+        self.get_collections_calls += 1
+        if self.fail_get_collections:
+            raise ConnectionError("qdrant unavailable")
+        return SimpleNamespace(collections=[SimpleNamespace(name=n) for n in self.collections])
+
+    def get_aliases(self):
+        return SimpleNamespace(
+            aliases=[SimpleNamespace(alias_name=a, collection_name=c) for a, c in self.aliases.items()]
+        )
+
+    def update_collection_aliases(self, change_aliases_operations):
+        self.alias_operations.append(change_aliases_operations)
+        for op in change_aliases_operations:
+            if isinstance(op, qmodels.DeleteAliasOperation):
+                if op.delete_alias.alias_name not in self.aliases:
+                    raise RuntimeError(f"Alias {op.delete_alias.alias_name} does not exist")
+                del self.aliases[op.delete_alias.alias_name]
+            else:
+                self.aliases[op.create_alias.alias_name] = op.create_alias.collection_name
+
+    def create_collection(self, collection_name, vectors_config):
+        if collection_name in self.collections:
+            raise UnexpectedResponse(409, "Conflict", b"Collection already exists", httpx.Headers())
+        self.collections[collection_name] = {}
+        self.vector_configs[collection_name] = vectors_config
+
+    def get_collection(self, collection_name):
+        if collection_name not in self.collections:
+            raise UnexpectedResponse(404, "Not Found", b"Collection not found", httpx.Headers())
+        vectors = self.vector_configs.get(collection_name, qmodels.VectorParams(size=2, distance=qmodels.Distance.COSINE))
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=vectors)))
+
+    def delete_collection(self, collection_name):
+        del self.collections[collection_name]
+
+    def scroll(self, collection_name, limit, offset=None, with_payload=True, with_vectors=False):
+        if self.on_scroll is not None:
+            self.on_scroll(collection_name)
+        points = self.collections[self._resolve(collection_name)]
+        ids = sorted(points, key=str)
+        start = ids.index(offset) if offset is not None else 0
+        page = ids[start:start + limit]
+        next_offset = ids[start + limit] if start + limit < len(ids) else None
+        return [self._record(points, i, with_payload, with_vectors) for i in page], next_offset
+
+    def retrieve(self, collection_name, ids, with_payload=True, with_vectors=False):
+        points = self.collections[self._resolve(collection_name)]
+        return [self._record(points, i, with_payload, with_vectors) for i in ids if i in points]
+
+    def upsert(self, collection_name, points):
+        coll = self.collections[self._resolve(collection_name)]
+        for p in points:
+            coll[p.id] = {"payload": p.payload, "vector": p.vector}
+
+    def count(self, collection_name, exact=True):
+        return SimpleNamespace(count=len(self.collections[self._resolve(collection_name)]))
+
+
+@pytest.fixture
+def fake_qdrant():
+    return FakeQdrant()
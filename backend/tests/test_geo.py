@@ -0,0 +1,27 @@
+import pytest
+
+from backend.app.utils.geo import distance_to_geohash_km, encode_geohash, geohash_bbox
+from backend.app.utils.scoring import merge_ranked
+
+
+def test_encode_geohash_known_points():
+    assert encode_geohash(51.5074, -0.1278, 5) == "gcpvj"
+    assert encode_geohash(53.4808, -2.2426, 3) == "gcw"
+
+
+def test_geohash_bbox_contains_point():
+    lat_min, lat_max, lon_min, lon_max = geohash_bbox(encode_geohash(53.4808, -2.2426, 4))
+    assert lat_min <= 53.4808 <= lat_max
+    assert lon_min <= -2.2426 <= lon_max
+
+
+def test_distance_to_geohash():
+    assert distance_to_geohash_km(53.4808, -2.2426, "gcw") == 0.0
+    assert distance_to_geohash_km(53.4808, -2.2426, "gcp") == pytest.approx(170, abs=5)
+
+
+def test_merge_ranked_orders_and_dedupes():
+    shard_a = [{"id": "a", "final_score": 0.9}, {"id": "c", "final_score": 0.5}]
+    shard_b = [{"id": "b", "final_score": 0.7}, {"id": "a", "final_score": 0.6}, {"id": "d", "final_score": 0.1}]
+    merged = merge_ranked([shard_a, shard_b], top_k=3)
+    assert [r["id"] for r in merged] == ["a", "b", "c"]
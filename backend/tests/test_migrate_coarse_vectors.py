@@ -0,0 +1,50 @@
+import sys
+
+import pytest
+
+from backend import migrate_coarse_vectors as migrate
+
+
+def _points(*ids):
+    return {i: {"payload": {"title": i}, "vector": [3.0, 4.0, 0.0]} for i in ids}
+
+
+@pytest.fixture
+def fake(fake_qdrant, monkeypatch):
+    monkeypatch.setattr(migrate, "client", fake_qdrant)
+    # swap_alias / resolve_collection / point_ids live in the vectordb module the script imported
+    monkeypatch.setattr(sys.modules[migrate.swap_alias.__module__], "client", fake_qdrant)
+    monkeypatch.setattr(
+        migrate,
+        "ensure_collection",
+        lambda collection_name, vector_size, coarse_vector_size: fake_qdrant.collections.setdefault(collection_name, {}),
+    )
+    return fake_qdrant
+
+
+def test_migrate_then_switch_copies_late_writes(fake):
+    fake.collections = {"spots_v1": _points("a", "b")}
+    fake.aliases = {"spots": "spots_v1"}
+
+    assert migrate.migrate_collection("spots_v1", "spots_coarse", coarse_dim=2, batch_size=1) == 2
+    assert fake.collections["spots_coarse"]["a"]["vector"]["coarse"] == pytest.approx([0.6, 0.8])
+
+    # Written through the alias after the copy
+    fake.collections["spots_v1"]["late"] = _points("late")["late"]
+
+    previous = migrate.switch_alias("spots", "spots_coarse", coarse_dim=2)
+    assert previous == "spots_v1"
+    assert fake.aliases["spots"] == "spots_coarse"
+    assert set(fake.collections["spots_coarse"]) == {"a", "b", "late"}
+
+
+def test_switch_refuses_plain_collection_without_replace(fake):
+    fake.collections = {"spots": _points("a"), "spots_coarse": {}}
+
+    with pytest.raises(ValueError, match="--replace-collection"):
+        migrate.switch_alias("spots", "spots_coarse", coarse_dim=2)
+
+    assert migrate.switch_alias("spots", "spots_coarse", coarse_dim=2, replace_collection=True) is None
+    assert fake.aliases == {"spots": "spots_coarse"}
+    assert set(fake.collections["spots_coarse"]) == {"a"}
+    assert "spots" not in fake.collections
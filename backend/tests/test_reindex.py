@@ -0,0 +1,176 @@
+import os
+import sys
+
+import pytest
+from qdrant_client.http import models as qmodels
+
+from backend import reindex
+
+
+def _points(*ids, model=None):
+    payload = {reindex.EMBEDDING_MODEL_FIELD: model} if model else {}
+    return {i: {"payload": dict(payload, title=i), "vector": [0.0, 1.0]} for i in ids}
+
+
+NEW_MODEL = reindex.settings.EMBEDDING_MODEL
+OLD_MODEL = "text-embedding-ada-002"
+
+
+@pytest.fixture
+def fake(fake_qdrant, monkeypatch):
+    fake = fake_qdrant
+    monkeypatch.setattr(reindex, "client", fake)
+    # swap_alias / resolve_collection live in the vectordb module reindex imported
+    monkeypatch.setattr(sys.modules[reindex.swap_alias.__module__], "client", fake)
+    monkeypatch.setattr(reindex, "embed_text", lambda texts, model=None: [[1.0, 0.0] for _ in texts])
+    return fake
+
+
+def _done_state(path, **extra):
+    state = {
+        "alias": "spots",
+        "source": "spots_v1",
+        "target": "spots_v2",
+        "model": reindex.settings.EMBEDDING_MODEL,
+        "offset": None,
+        "processed": 2,
+        "done": True,
+    }
+    state.update(extra)
+    reindex.save_checkpoint(path, state)
+    return state
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    assert reindex.load_checkpoint(path) is None
+
+    state = {"alias": "spots", "offset": "abc", "processed": 3, "done": False}
+    reindex.save_checkpoint(path, state)
+    assert reindex.load_checkpoint(path) == state
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    now = [100.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(reindex.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(reindex.time, "sleep", fake_sleep)
+
+    limiter = reindex.RateLimiter(2.0)
+    limiter.wait()
+    limiter.wait()
+    limiter.wait()
+    assert sleeps == [pytest.approx(0.5), pytest.approx(0.5)]
+
+    sleeps.clear()
+    unlimited = reindex.RateLimiter(0)
+    unlimited.wait()
+    unlimited.wait()
+    assert sleeps == []
+
+
+def test_resume_refuses_model_change(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    _done_state(path, model="text-embedding-ada-002", done=False)
+    with pytest.raises(ValueError, match="text-embedding-ada-002"):
+        reindex.reindex("spots", "spots_v2", path, resume=True)
+
+
+def test_catch_up_copies_points_missing_from_target(fake):
+    fake.collections = {"spots_v1": _points("a", "b", "c"), "spots_v2": _points("a", model=NEW_MODEL)}
+    assert reindex.catch_up("spots_v1", "spots_v2", batch_size=1, rate=0) == 2
+    assert set(fake.collections["spots_v2"]) == {"a", "b", "c"}
+    assert fake.collections["spots_v2"]["c"]["vector"] == [1.0, 0.0]
+    assert fake.collections["spots_v2"]["c"]["payload"][reindex.EMBEDDING_MODEL_FIELD] == NEW_MODEL
+    assert reindex.catch_up("spots_v1", "spots_v2", rate=0) == 0
+
+
+def test_catch_up_reembeds_points_written_with_old_model(fake):
+    # "late" was created through the alias after the switch by a process still on the old model
+    fake.collections = {
+        "spots_v1": _points("a", model=OLD_MODEL),
+        "spots_v2": dict(_points("a", model=NEW_MODEL), **_points("late", model=OLD_MODEL)),
+    }
+    assert reindex.catch_up("spots_v1", "spots_v2", rate=0) == 1
+    late = fake.collections["spots_v2"]["late"]
+    assert late["vector"] == [1.0, 0.0]
+    assert late["payload"] == {"title": "late", reindex.EMBEDDING_MODEL_FIELD: NEW_MODEL}
+    assert reindex.catch_up("spots_v1", "spots_v2", rate=0) == 0
+
+
+def test_switch_catches_up_then_rollback_restores_alias(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    fake.collections = {"spots_v1": _points("a", "b", "late"), "spots_v2": _points("a", "b")}
+    fake.aliases = {"spots": "spots_v1"}
+    _done_state(path)
+
+    state = reindex.switch_alias(path, rate=0)
+    assert fake.aliases["spots"] == "spots_v2"
+    assert "late" in fake.collections["spots_v2"]
+    assert state["previous"] == "spots_v1"
+    assert reindex.load_checkpoint(path)["previous"] == "spots_v1"
+
+    state = reindex.rollback(path)
+    assert fake.aliases["spots"] == "spots_v1"
+    assert state["target"] == "spots_v1"
+    assert state["previous"] is None
+    with pytest.raises(ValueError):
+        reindex.rollback(path)
+
+
+def test_rollback_reembeds_spots_written_after_switch(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    fake.collections = {"spots_v1": _points("a", model=OLD_MODEL), "spots_v2": _points("a", model=NEW_MODEL)}
+    fake.aliases = {"spots": "spots_v1"}
+    _done_state(path, source_model=OLD_MODEL)
+    reindex.switch_alias(path, rate=0)
+
+    fake.collections["spots_v2"].update(_points("new", model=NEW_MODEL))
+    state = reindex.rollback(path, rate=0)
+
+    assert fake.aliases["spots"] == "spots_v1"
+    assert fake.collections["spots_v1"]["new"]["payload"][reindex.EMBEDDING_MODEL_FIELD] == OLD_MODEL
+    assert state["model"] == OLD_MODEL
+
+
+def test_rollback_refuses_to_drop_spots_without_previous_model(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    fake.collections = {"spots_v1": _points("a"), "spots_v2": _points("a", "new", model=NEW_MODEL)}
+    fake.aliases = {"spots": "spots_v2"}
+    _done_state(path, previous="spots_v1")
+
+    with pytest.raises(ValueError, match="--previous-model"):
+        reindex.rollback(path, rate=0)
+    assert fake.aliases["spots"] == "spots_v2"
+
+    reindex.rollback(path, previous_model=OLD_MODEL, rate=0)
+    assert fake.aliases["spots"] == "spots_v1"
+    assert "new" in fake.collections["spots_v1"]
+
+
+def test_switch_refuses_incomplete_reindex(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    _done_state(path, done=False)
+    with pytest.raises(ValueError, match="not completed"):
+        reindex.switch_alias(path, rate=0)
+
+
+def test_replace_collection_creates_alias_without_delete(tmp_path, fake):
+    path = str(tmp_path / "checkpoint.json")
+    fake.collections = {"spots": _points("a"), "spots_v2": _points("a")}
+    _done_state(path, source="spots")
+
+    with pytest.raises(ValueError, match="--replace-collection"):
+        reindex.switch_alias(path, rate=0)
+
+    state = reindex.switch_alias(path, replace_collection=True, rate=0)
+    assert "spots" not in fake.collections
+    assert fake.aliases == {"spots": "spots_v2"}
+    assert state["previous"] is None
+    assert [type(op) for op in fake.alias_operations[-1]] == [qmodels.CreateAliasOperation]
@@ -0,0 +1,200 @@
+import threading
+import time
+
+import pytest
+
+from backend.app.services.resilience import (
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceeded,
+    LatencyTracker,
+    ResilientCaller,
+)
+
+
+class FlakyUpstream:
+    """Stand-in upstream that fails the first `failures` calls, then answers."""
+
+    def __init__(self, failures: int = 0, delay_s: float = 0.0):
+        self.failures = failures
+        self.delay_s = delay_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, timeout_s: float):
+        with self._lock:
+            self.calls += 1
+            call_no = self.calls
+        time.sleep(self.delay_s)
+        if call_no <= self.failures:
+            raise ConnectionError(f"injected failure {call_no}")
+        return f"ok-{call_no}"
+
+
+class SlowFirstUpstream:
+    """Stand-in upstream whose first call hangs and later calls answer immediately."""
+
+    def __init__(self, hang_s: float):
+        self.hang_s = hang_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, timeout_s: float):
+        with self._lock:
+            self.calls += 1
+            call_no = self.calls
+        if call_no == 1:
+            time.sleep(self.hang_s)
+        return f"ok-{call_no}"
+
+
+def _caller(**kwargs):
+    kwargs.setdefault("sleep", lambda s: None)
+    kwargs.setdefault("hedge", False)
+    return ResilientCaller("test", **kwargs)
+
+
+def test_retries_until_success():
+    upstream = FlakyUpstream(failures=2)
+    caller = _caller(max_retries=2)
+    assert caller.call(upstream, Deadline(1.0)) == "ok-3"
+    assert upstream.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    upstream = FlakyUpstream(failures=5)
+    caller = _caller(max_retries=1)
+    with pytest.raises(ConnectionError):
+        caller.call(upstream, Deadline(1.0))
+    assert upstream.calls == 2
+
+
+def test_deadline_exceeded_on_slow_upstream():
+    upstream = FlakyUpstream(delay_s=0.5)
+    caller = _caller(max_retries=3)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        caller.call(upstream, Deadline(0.05))
+    assert time.monotonic() - start < 0.4
+
+
+def test_fallback_used_on_failure():
+    upstream = FlakyUpstream(failures=5)
+    caller = _caller(max_retries=0)
+    assert caller.call(upstream, Deadline(1.0), fallback=lambda e: "fallback") == "fallback"
+
+
+def test_circuit_opens_and_fails_fast():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout_s=10.0, clock=lambda: now[0])
+    upstream = FlakyUpstream(failures=2)
+    caller = _caller(breaker=breaker, max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            caller.call(upstream, Deadline(1.0))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        caller.call(upstream, Deadline(1.0))
+    assert upstream.calls == 2
+
+    now[0] = 11.0
+    assert caller.call(upstream, Deadline(1.0)) == "ok-3"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedged_request_wins_over_slow_primary():
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(0.01)
+    upstream = SlowFirstUpstream(hang_s=0.5)
+    caller = _caller(tracker=tracker, hedge=True)
+
+    start = time.monotonic()
+    assert caller.call(upstream, Deadline(1.0)) == "ok-2"
+    assert time.monotonic() - start < 0.4
+
+
+def test_deadline_child_takes_share_of_remaining():
+    now = [0.0]
+    parent = Deadline(10.0, clock=lambda: now[0])
+    now[0] = 2.0
+    child = parent.child(0.5)
+    assert child.remaining() == pytest.approx(4.0)
+    assert parent.remaining() == pytest.approx(8.0)
+
+
+def test_half_open_allows_single_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout_s=10.0, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11.0
+    assert breaker.allow()
+    assert [breaker.allow() for _ in range(5)] == [False] * 5
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 22.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert all(breaker.allow() for _ in range(5))
+
+
+def test_latency_tracked_per_operation():
+    caller = _caller()
+    caller.call(FlakyUpstream(), Deadline(1.0), operation="search")
+    caller.call(FlakyUpstream(), Deadline(1.0), operation="search")
+    caller.call(FlakyUpstream(), Deadline(1.0), operation="scroll")
+    assert caller.tracker_for("search").count == 2
+    assert caller.tracker_for("scroll").count == 1
+    assert caller.tracker.count == 0
+
+
+def test_concurrent_calls_within_bulkhead_do_not_queue():
+    breaker = CircuitBreaker("test", failure_threshold=5)
+    caller = _caller(breaker=breaker, max_retries=0, max_concurrency=40)
+    upstream = FlakyUpstream(delay_s=0.3)
+    errors = []
+
+    def run():
+        try:
+            caller.call(upstream, Deadline(0.5))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_full_bulkhead_rejects_without_opening_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    caller = _caller(breaker=breaker, max_retries=0, max_concurrency=1)
+    slow = threading.Thread(target=caller.call, args=(FlakyUpstream(delay_s=0.3), Deadline(1.0)))
+    slow.start()
+    time.sleep(0.05)
+
+    upstream = FlakyUpstream()
+    with pytest.raises(BulkheadFullError):
+        caller.call(upstream, Deadline(0.05))
+    slow.join()
+    assert upstream.calls == 0
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert caller.call(upstream, Deadline(1.0)) == "ok-1"
+
+
+def test_expired_deadline_is_not_an_upstream_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    caller = _caller(breaker=breaker)
+    with pytest.raises(DeadlineExceeded):
+        caller.call(FlakyUpstream(), Deadline(0.0))
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,156 @@
+import pytest
+
+from backend.app.services import search_engine
+from backend.app.services.resilience import DeadlineExceeded
+from backend.app.services.vectordb import DISPLAY_PAYLOAD_FIELDS, SCORING_PAYLOAD_FIELDS
+from backend.app.utils.cache import LRUCache
+
+
+class PayloadStore:
+    """Stand-in for fetch_payloads that records every batched lookup."""
+
+    def __init__(self, payloads, fail=False):
+        self.payloads = payloads
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, ids, fields=None, collection_name=None, deadline=None, caller=None):
+        self.calls.append((collection_name, list(ids)))
+        if self.fail:
+            raise ConnectionError("qdrant unavailable")
+        stored = self.payloads.get(collection_name, {})
+        return {i: stored[i] for i in ids if i in stored}
+
+
+def _candidate(point_id, score, collection="spots"):
+    return {
+        "id": point_id,
+        "score": score,
+        "payload": {"lat": 51.5, "lon": -0.12, "precomputed_traffic": 100.0, "traffic_confidence": "high"},
+        "collection": collection,
+    }
+
+
+def _display(title):
+    return {"title": title, "description": f"{title} description", "category_tags": ["retail"]}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(search_engine.settings, "SHARDING_ENABLED", False)
+    monkeypatch.setattr(search_engine, "_query_results", LRUCache(8))
+    monkeypatch.setattr(search_engine, "_query_embeddings", LRUCache(8))
+    monkeypatch.setattr(search_engine, "embed_text", lambda texts, model=None, deadline=None: [[1.0, 0.0] for _ in texts])
+    return monkeypatch
+
+
+def test_hydrate_groups_lookups_by_collection(engine):
+    store = PayloadStore({"shard_a": {"1": _display("One"), "3": _display("Three")}, "shard_b": {"2": _display("Two")}})
+    engine.setattr(search_engine, "fetch_payloads", store)
+
+    results = [{"id": "1", "collection": "shard_a"}, {"id": "2", "collection": "shard_b"}, {"id": "3", "collection": "shard_a"}]
+    hydrated = search_engine._hydrate(results)
+
+    assert sorted(store.calls) == [("shard_a", ["1", "3"]), ("shard_b", ["2"])]
+    assert [r["title"] for r in hydrated] == ["One", "Two", "Three"]
+    assert hydrated[0]["category_tags"] == ["retail"]
+
+
+def test_hydrate_drops_ids_missing_from_lookup(engine):
+    engine.setattr(search_engine, "fetch_payloads", PayloadStore({"spots": {"1": _display("One")}}))
+
+    hydrated = search_engine._hydrate([{"id": "1", "collection": "spots"}, {"id": "gone", "collection": "spots"}])
+
+    assert [r["id"] for r in hydrated] == ["1"]
+
+
+def test_search_projects_scoring_fields_and_hydrates_top_k_only(engine):
+    searches = []
+
+    def search_vectors(query_vector, top_k, deadline=None, payload_fields=None, **kwargs):
+        searches.append(payload_fields)
+        return [_candidate(str(i), 1.0 - i / 10) for i in range(5)]
+
+    store = PayloadStore({"spots": {str(i): _display(f"Spot {i}") for i in range(5)}})
+    engine.setattr(search_engine, "search_vectors", search_vectors)
+    engine.setattr(search_engine, "fetch_payloads", store)
+
+    results = search_engine.search_spots("coffee", top_k=2)
+
+    assert searches == [SCORING_PAYLOAD_FIELDS]
+    assert not set(SCORING_PAYLOAD_FIELDS) & set(DISPLAY_PAYLOAD_FIELDS)
+    assert store.calls == [("spots", ["0", "1"])]
+    assert [r["title"] for r in results] == ["Spot 0", "Spot 1"]
+    assert all("degraded" not in r for r in results)
+
+
+def test_search_degrades_when_display_lookup_fails(engine):
+    engine.setattr(
+        search_engine,
+        "search_vectors",
+        lambda query_vector, top_k, **kwargs: [_candidate("1", 0.9), _candidate("2", 0.8)],
+    )
+    engine.setattr(search_engine, "fetch_payloads", PayloadStore({}, fail=True))
+
+    results = search_engine.search_spots("coffee", top_k=2)
+    assert [r["degraded"] for r in results] == ["no_display_fields"] * 2
+    assert [r["title"] for r in results] == [None, None]
+
+    # With a cached list for the same request, that list is served instead
+    engine.setattr(search_engine, "fetch_payloads", PayloadStore({"spots": {"1": _display("One"), "2": _display("Two")}}))
+    search_engine.search_spots("coffee", top_k=2)
+    engine.setattr(search_engine, "fetch_payloads", PayloadStore({}, fail=True))
+
+    results = search_engine.search_spots("coffee", top_k=2)
+    assert [r["degraded"] for r in results] == ["cached_results"] * 2
+    assert [r["title"] for r in results] == ["One", "Two"]
+
+
+def _pages(*titles_per_page, fail_at=None):
+    def scroll_payloads(limit=1000, offset=None, collection_name=None, deadline=None, caller=None):
+        page_no = offset or 0
+        if page_no == fail_at:
+            raise DeadlineExceeded("out of budget")
+        page = [
+            {"id": f"{page_no}-{i}", "payload": {"title": title}, "collection": collection_name}
+            for i, title in enumerate(titles_per_page[page_no])
+        ]
+        return page, page_no + 1 if page_no + 1 < len(titles_per_page) else None
+
+    return scroll_payloads
+
+
+def test_lexical_scan_pages_through_whole_collection(engine):
+    engine.setattr(search_engine, "scroll_payloads", _pages(["tea shop"], ["book store"], ["coffee roastery", "coffee bar"]))
+
+    results = search_engine.lexical_candidates("coffee", top_k=5)
+    assert sorted(r["id"] for r in results) == ["2-0", "2-1"]
+
+
+def test_lexical_scan_ranks_scanned_spots_when_deadline_runs_out(engine):
+    engine.setattr(search_engine, "scroll_payloads", _pages(["coffee cart"], ["coffee bar"], fail_at=1))
+    assert [r["id"] for r in search_engine.lexical_candidates("coffee", top_k=5)] == ["0-0"]
+
+    engine.setattr(search_engine, "scroll_payloads", _pages(["coffee cart"], fail_at=0))
+    with pytest.raises(DeadlineExceeded):
+        search_engine.lexical_candidates("coffee", top_k=5)
+
+
+def test_lexical_scan_skips_failing_shard(engine):
+    scanned = []
+
+    def scroll_payloads(limit=1000, offset=None, collection_name=None, deadline=None, caller=None):
+        scanned.append((collection_name, caller))
+        if collection_name == "spots__gh_u09":
+            raise ConnectionError("shard deleted")
+        return [{"id": "1", "payload": {"title": "coffee bar"}, "collection": collection_name}], None
+
+    engine.setattr(search_engine, "scroll_payloads", scroll_payloads)
+    results = search_engine.lexical_candidates("coffee", top_k=5, collections=["spots__gh_u09", "spots__gh_u0d"])
+
+    assert [r["collection"] for r in results] == ["spots__gh_u0d"]
+    assert scanned[0][1] is search_engine.caller_for("spots__gh_u09")
+    assert scanned[0][1] is not scanned[1][1]
+
+    with pytest.raises(ConnectionError):
+        search_engine.lexical_candidates("coffee", top_k=5, collections=["spots__gh_u09"])
@@ -0,0 +1,122 @@
+import sys
+
+import pytest
+
+from backend.app.services import sharding
+from backend.app.services.resilience import ResilientCaller
+from backend.app.utils.geo import encode_geohash
+
+BASE = sharding.settings.QDRANT_COLLECTION
+
+# Two spots in the same precision-3 cell that fall into different precision-4 children
+PARIS = (48.8566, 2.3522)
+CHARTRES = (48.4439, 1.4890)
+
+
+def _spot(lat, lon):
+    return {"payload": {"lat": lat, "lon": lon}, "vector": [1.0, 0.0]}
+
+
+def _shard(prefix):
+    return sharding.shard_collection_name(prefix)
+
+
+@pytest.fixture
+def fake(fake_qdrant, monkeypatch):
+    fake = fake_qdrant
+    monkeypatch.setattr(sharding, "client", fake)
+    # Shards are created through the vectordb module sharding imported
+    monkeypatch.setattr(sys.modules[sharding.create_collection_if_missing.__module__], "client", fake)
+    monkeypatch.setattr(sharding, "vectordb_caller", ResilientCaller("test", max_retries=0, hedge=False, sleep=lambda s: None))
+    monkeypatch.setattr(sharding, "_registry", {})
+    monkeypatch.setattr(sharding, "_registry_loaded_at", 0.0)
+    monkeypatch.setattr(sharding, "_registry_refreshing", False)
+    return fake
+
+
+def test_list_shards_serves_last_registry_when_refresh_fails(fake):
+    fake.collections = {_shard("u09"): {}, "other": {}}
+    assert sharding.list_shards() == {"u09": _shard("u09")}
+
+    fake.fail_get_collections = True
+    assert sharding.list_shards(refresh=True) == {"u09": _shard("u09")}
+    assert not sharding._registry_refreshing
+
+
+def test_list_shards_raises_without_any_registry(fake):
+    fake.fail_get_collections = True
+    with pytest.raises(ConnectionError):
+        sharding.list_shards()
+
+
+def test_list_shards_serves_cache_while_refresh_in_flight(fake, monkeypatch):
+    fake.collections = {_shard("u09"): {}}
+    sharding.list_shards()
+    monkeypatch.setattr(sharding, "_registry_loaded_at", sharding._registry_loaded_at - sharding.settings.SHARD_REGISTRY_TTL_S - 1)
+    monkeypatch.setattr(sharding, "_registry_refreshing", True)
+
+    calls = fake.get_collections_calls
+    assert sharding.list_shards() == {"u09": _shard("u09")}
+    assert fake.get_collections_calls == calls
+
+
+def test_shard_callers_are_separate(fake):
+    assert sharding.caller_for(_shard("u09")) is sharding.caller_for(_shard("u09"))
+    assert sharding.caller_for(_shard("u09")) is not sharding.caller_for(_shard("u0d"))
+    assert sharding.caller_for(BASE) is sharding.vectordb_caller
+
+
+def test_route_spot_prefers_children_of_a_split_shard(fake):
+    paris = encode_geohash(*PARIS)
+    fake.collections = {_shard(paris[:3]): {}, _shard(paris[:4]): {}}
+    assert sharding.route_spot(*PARIS) == _shard(paris[:4])
+
+    # A spot in a child region that does not exist yet gets a child, not the parent
+    chartres = encode_geohash(*CHARTRES)
+    assert sharding.route_spot(*CHARTRES) == _shard(chartres[:4])
+    assert _shard(chartres[:4]) in fake.collections
+
+
+def test_rebalance_copies_late_writes_before_deleting_parent(fake):
+    prefix = encode_geohash(*PARIS, 3)
+    parent = _shard(prefix)
+    fake.collections = {parent: {"a": _spot(*PARIS), "b": _spot(*CHARTRES)}}
+    # A spot written to the parent after the copy pass, before the registries settled
+    settles = []
+
+    def sleep(seconds):
+        settles.append(seconds)
+        fake.collections[parent]["late"] = _spot(*PARIS)
+
+    split = sharding.rebalance(max_points=1, settle_s=7.0, sleep=sleep)
+
+    assert settles == [7.0]
+    assert parent not in fake.collections
+    children = split[parent]
+    assert sorted(children) == sorted({_shard(encode_geohash(*PARIS, 4)), _shard(encode_geohash(*CHARTRES, 4))})
+    assert "late" in fake.collections[_shard(encode_geohash(*PARIS, 4))]
+    assert sum(len(fake.collections[c]) for c in children) == 3
+
+
+def test_rebalance_keeps_parent_when_catch_up_never_converges(fake):
+    parent = _shard(encode_geohash(*PARIS, 3))
+    fake.collections = {parent: {"a": _spot(*PARIS), "b": _spot(*CHARTRES)}}
+    writes = [0]
+
+    def keep_writing(collection_name):
+        if collection_name == parent and fake.collections.get(_shard(encode_geohash(*PARIS, 4))) is not None:
+            writes[0] += 1
+            fake.collections[parent][f"late-{writes[0]}"] = _spot(*PARIS)
+
+    fake.on_scroll = keep_writing
+    with pytest.raises(RuntimeError, match="not deleting"):
+        sharding.rebalance(max_points=1, settle_s=0.0, sleep=lambda s: None)
+    assert parent in fake.collections
+
+
+def test_creating_an_existing_shard_keeps_its_points(fake):
+    name = _shard("u09t")
+    fake.collections = {name: {"a": _spot(*PARIS)}}
+
+    sharding.create_collection_if_missing(collection_name=name, vector_size=2)
+    assert fake.collections[name] == {"a": _spot(*PARIS)}
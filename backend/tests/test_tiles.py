@@ -0,0 +1,78 @@
+import pytest
+
+from backend.app.utils.geo import latlon_to_tile_fraction
+from backend.app.utils.tiles import MAX_TILE_ZOOM, TileIndex
+
+
+def _tile(index, lat, lon, z):
+    fx, fy = latlon_to_tile_fraction(lat, lon, z)
+    return index.tile(z, int(fx), int(fy))
+
+
+def test_world_tile_aggregates_all_spots():
+    index = TileIndex(max_zoom=4, grid_size=2)
+    index.add("a", 51.5, -0.12, traffic=100, tags=["london", "retail"])
+    index.add("b", 53.48, -2.24, traffic=300, tags=["manchester", "retail"])
+
+    tile = index.tile(0, 0, 0)
+    assert tile["total"] == 2
+    cluster = tile["clusters"][0]
+    assert cluster["count"] == 2
+    assert cluster["lat"] == pytest.approx((51.5 + 53.48) / 2)
+    assert cluster["avg_traffic"] == pytest.approx(200)
+    assert cluster["top_tags"][0] == "retail"
+
+
+def test_clusters_split_at_higher_zoom():
+    index = TileIndex(max_zoom=8, grid_size=8)
+    index.add("london", 51.5, -0.12)
+    index.add("bristol", 51.45, -2.58)
+
+    world = index.tile(0, 0, 0)
+    assert [c["count"] for c in world["clusters"]] == [2]
+
+    # Both cities fall into z5 tile (15, 10), but into different cells of its grid
+    assert _tile(index, 51.5, -0.12, 5)["x"] == _tile(index, 51.45, -2.58, 5)["x"] == 15
+    tile = index.tile(5, 15, 10)
+    assert tile["total"] == 2
+    assert sorted(c["lon"] for c in tile["clusters"]) == pytest.approx([-2.58, -0.12])
+    assert [c["count"] for c in tile["clusters"]] == [1, 1]
+
+
+def test_upsert_replaces_and_invalidates_cache():
+    index = TileIndex(max_zoom=3, grid_size=2)
+    index.add("a", 51.5, -0.12, traffic=100)
+    assert index.tile(0, 0, 0)["total"] == 1
+
+    index.add("a", 51.5, -0.12, traffic=500)
+    index.add("b", 40.7, -74.0, traffic=0)
+    tile = index.tile(0, 0, 0)
+    assert tile["total"] == 2
+    assert len(index) == 2
+
+    index.remove("b")
+    assert index.tile(0, 0, 0)["clusters"][0]["avg_traffic"] == pytest.approx(500)
+
+
+def test_serves_raw_spots_above_cluster_zoom():
+    index = TileIndex(max_zoom=3, grid_size=2, top_tags=1)
+    index.add("a", 51.5, -0.12, traffic=100, tags=["cafe", "retail"])
+    index.add("b", 51.5001, -0.1201, traffic=300, tags=["bar"])
+    index.add("c", 51.45, -2.58, traffic=50)
+    assert len(index._cells) == 4
+
+    tile = _tile(index, 51.5, -0.12, 15)
+    assert tile["total"] == 2
+    assert [(c["count"], c["avg_traffic"], c["top_tags"]) for c in tile["clusters"]] == [(1, 300.0, ["bar"]), (1, 100.0, ["cafe"])]
+
+    index.remove("b")
+    assert _tile(index, 51.5, -0.12, 15)["total"] == 1
+    assert _tile(index, 51.45, -2.58, 15)["clusters"][0]["lon"] == pytest.approx(-2.58)
+
+
+def test_rejects_tiles_outside_zoom():
+    index = TileIndex(max_zoom=3)
+    with pytest.raises(ValueError):
+        index.tile(MAX_TILE_ZOOM + 1, 0, 0)
+    with pytest.raises(ValueError):
+        index.tile(1, 2, 0)
@@ -0,0 +1,87 @@
+import math
+
+import pytest
+from qdrant_client.http import models as qmodels
+
+from backend.app.services import vectordb
+from backend.app.services.vectordb import (
+    COARSE_VECTOR_NAME,
+    EMBEDDING_MODEL_FIELD,
+    FULL_VECTOR_NAME,
+    build_point_vector,
+    build_vectors_config,
+    check_coarse_model,
+    check_vector_layout,
+)
+from backend.app.utils.vectors import supports_truncation, truncate_embedding
+
+
+def test_truncate_embedding_keeps_prefix_direction_at_unit_length():
+    vec = truncate_embedding([3.0, 4.0, 12.0], 2)
+    assert vec == pytest.approx([0.6, 0.8])
+    assert math.sqrt(sum(v * v for v in vec)) == pytest.approx(1.0)
+
+
+def test_truncate_embedding_zero_vector():
+    assert truncate_embedding([0.0, 0.0, 1.0], 2) == [0.0, 0.0]
+
+
+def test_vectors_config_without_coarse_is_single_vector():
+    config = build_vectors_config(8, coarse_vector_size=0)
+    assert isinstance(config, qmodels.VectorParams)
+    assert config.size == 8
+
+
+def test_vectors_config_with_coarse_is_named():
+    config = build_vectors_config(8, coarse_vector_size=2)
+    assert config[FULL_VECTOR_NAME].size == 8
+    assert config[COARSE_VECTOR_NAME].size == 2
+
+
+def test_point_vector_matches_layout():
+    embedding = [3.0, 4.0, 0.0, 1.0]
+    assert build_point_vector(embedding, coarse_vector_size=0) == embedding
+    named = build_point_vector(embedding, coarse_vector_size=2)
+    assert named[FULL_VECTOR_NAME] == embedding
+    assert named[COARSE_VECTOR_NAME] == pytest.approx([0.6, 0.8])
+
+
+def test_layout_check_accepts_matching_configs():
+    check_vector_layout("c", build_vectors_config(8, 0), 8, coarse_vector_size=0)
+    check_vector_layout("c", build_vectors_config(8, 2), 8, coarse_vector_size=2)
+
+
+def test_layout_check_rejects_legacy_collection_with_coarse_enabled():
+    with pytest.raises(ValueError, match="migrate_coarse_vectors.py"):
+        check_vector_layout("c", build_vectors_config(8, 0), 8, coarse_vector_size=2)
+
+
+def test_layout_check_rejects_coarse_size_mismatch():
+    with pytest.raises(ValueError, match="--coarse-dim 4"):
+        check_vector_layout("c", build_vectors_config(8, 2), 8, coarse_vector_size=4)
+
+
+def test_layout_check_rejects_named_collection_with_coarse_disabled():
+    with pytest.raises(ValueError, match="COARSE_VECTOR_DIM"):
+        check_vector_layout("c", build_vectors_config(8, 2), 8, coarse_vector_size=0)
+
+
+def test_coarse_vector_only_for_truncatable_models():
+    assert supports_truncation("text-embedding-3-large")
+    assert not supports_truncation("text-embedding-ada-002")
+
+    check_coarse_model("text-embedding-3-small", coarse_vector_size=256)
+    check_coarse_model("text-embedding-ada-002", coarse_vector_size=0)
+    with pytest.raises(ValueError, match="text-embedding-ada-002"):
+        check_coarse_model("text-embedding-ada-002", coarse_vector_size=256)
+
+
+def test_upsert_spot_records_embedding_model(fake_qdrant, monkeypatch):
+    monkeypatch.setattr(vectordb, "client", fake_qdrant)
+    fake_qdrant.collections = {"spots": {}}
+
+    vectordb.upsert_spot("a", [1.0, 0.0], {"title": "A"}, collection_name="spots", coarse_vector_size=0)
+    vectordb.upsert_spot("b", [1.0, 0.0], {"title": "B"}, collection_name="spots", coarse_vector_size=0, model="m")
+
+    assert fake_qdrant.collections["spots"]["a"]["payload"] == {"title": "A", EMBEDDING_MODEL_FIELD: vectordb.settings.EMBEDDING_MODEL}
+    assert fake_qdrant.collections["spots"]["b"]["payload"][EMBEDDING_MODEL_FIELD] == "m"
@@ -1,7 +1,25 @@
+import math
 import streamlit as st
+import pydeck as pdk
 import httpx
 
 BACKEND_URL = "http://localhost:8000"
+DEFAULT_MAP_CENTER = (54.0, -2.5)
+
+
+def tile_for(lat: float, lon: float, zoom: int):
+    n = 2 ** zoom
+    lat = max(-85.05112878, min(85.05112878, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+@st.cache_data(ttl=30)
+def fetch_tile(backend: str, z: int, x: int, y: int):
+    r = httpx.get(f"{backend}/spots/tiles/{z}/{x}/{y}", timeout=5.0)
+    r.raise_for_status()
+    return r.json()["clusters"]
 
 st.set_page_config(page_title="Semantic Ads Demo", layout="wide")
 
@@ -15,6 +33,8 @@ with st.sidebar:
     lat = st.number_input("Your latitude (optional)", value=0.0, format="%.6f")
     lon = st.number_input("Your longitude (optional)", value=0.0, format="%.6f")
     use_location = st.checkbox("Provide lat/lon", value=False)
+    show_map = st.checkbox("Show spot map", value=True)
+    map_zoom = st.slider("Map zoom", min_value=2, max_value=14, value=6)
 
 query = st.text_input("Search query", value="I want to advertise a football kit near stadiums")
 if st.button("Search"):
@@ -33,6 +53,8 @@ if st.button("Search"):
             r.raise_for_status()
             data = r.json()
             results = data.get("results", [])
+            if data.get("degraded"):
+                st.warning(f"Search backend is degraded ({data['degraded']}); results may be less relevant.")
             if not results:
                 st.info("No results found.")
             else:
@@ -44,3 +66,39 @@ if st.button("Search"):
                     st.markdown("---")
         except Exception as e:
             st.error(f"Search failed: {e}")
+
+if show_map:
+    st.subheader("Spot map")
+    center_lat, center_lon = (lat, lon) if use_location else DEFAULT_MAP_CENTER
+    cx, cy = tile_for(center_lat, center_lon, map_zoom)
+    n = 2 ** map_zoom
+    clusters = []
+    try:
+        # The 3x3 block of clustered tiles around the center; payload size depends on the grid, not the catalog
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                ty = cy + dy
+                if 0 <= ty < n:
+                    clusters.extend(fetch_tile(backend, map_zoom, (cx + dx) % n, ty))
+    except Exception as e:
+        st.error(f"Map tiles failed: {e}")
+
+    for c in clusters:
+        c["tags"] = ", ".join(c["top_tags"])
+        c["radius"] = 2000 * (2 ** (10 - map_zoom)) * math.sqrt(c["count"])
+    st.pydeck_chart(
+        pdk.Deck(
+            layers=[
+                pdk.Layer(
+                    "ScatterplotLayer",
+                    data=clusters,
+                    get_position="[lon, lat]",
+                    get_radius="radius",
+                    get_fill_color=[200, 30, 0, 160],
+                    pickable=True,
+                )
+            ],
+            initial_view_state=pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=map_zoom),
+            tooltip={"text": "{count} spots\nAvg traffic: {avg_traffic}\n{tags}"},
+        )
+    )